@@ -0,0 +1,106 @@
+"""
+Бенчмарк времени запуска консольных команд.
+
+Для каждой точки входа измеряется время импорта модуля по выводу
+python -X importtime и полное время запуска команды на маленьком файле.
+Результаты сравниваются с бюджетом STARTUP_BUDGET_MS; при превышении скрипт
+завершается с кодом 1, поэтому его можно запускать для проверки регрессий.
+
+Запуск из корня репозитория:
+    python -m hw_1.benchmark_startup
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join("hw_1", "artifacts", "startup_benchmark.txt")
+SAMPLE_FILE = os.path.join("hw_1", "test_file1.txt")
+
+# Точки входа: модуль, функция и аргументы типичного вызова
+ENTRY_POINTS = {
+    "nl_command": ("hw_1.nl_module", "nl_command", [SAMPLE_FILE]),
+    "tail_command": ("hw_1.tail_module", "tail_command", [SAMPLE_FILE]),
+    "wc_command": ("hw_1.wc_module", "wc_command", [SAMPLE_FILE]),
+    "generate_latex": ("hw_2.generate_example", None, []),
+}
+
+# Бюджет сверх запуска пустого интерпретатора, миллисекунды:
+# (время импорта модуля, время запуска команды)
+STARTUP_BUDGET_MS = {
+    "nl_command": (10, 15),
+    "tail_command": (10, 15),
+    "wc_command": (10, 15),
+    "generate_latex": (60, None),
+}
+
+
+def import_time_ms(module):
+    """Суммарное время импорта module с зависимостями по python -X importtime, мс."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    for line in reversed(result.stderr.splitlines()):
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1000
+    raise RuntimeError(f"Нет данных об импорте {module}")
+
+
+def run_time_ms(args, repeat):
+    """Медианное время запуска процесса с аргументами args, мс."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=ROOT, stdout=subprocess.DEVNULL, stdin=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main(repeat):
+    baseline = run_time_ms([sys.executable, "-c", "pass"], repeat)
+    lines = [
+        f"Время запуска команд сверх пустого интерпретатора ({baseline:.1f} мс), медиана из {repeat} запусков",
+        "",
+        "| Команда        | Импорт (мс) | Бюджет | Запуск (мс) | Бюджет |",
+        "|----------------|-------------|--------|-------------|--------|",
+    ]
+    over_budget = []
+    for name, (module, function, args) in ENTRY_POINTS.items():
+        import_budget, run_budget = STARTUP_BUDGET_MS[name]
+        import_ms = import_time_ms(module)
+        if import_ms > import_budget:
+            over_budget.append(f"{name}: импорт {import_ms:.1f} мс > {import_budget} мс")
+
+        run_cell, run_budget_cell = "-", "-"
+        if function is not None:
+            code = f"from {module} import {function}; {function}()"
+            run_ms = run_time_ms([sys.executable, "-c", code, *args], repeat) - baseline
+            run_cell, run_budget_cell = f"{run_ms:.1f}", str(run_budget)
+            if run_ms > run_budget:
+                over_budget.append(f"{name}: запуск {run_ms:.1f} мс > {run_budget} мс")
+
+        lines.append(
+            f"| {name:14} | {import_ms:11.1f} | {import_budget:6} | {run_cell:>11} | {run_budget_cell:>6} |"
+        )
+
+    print("\n".join(lines))
+    with open(os.path.join(ROOT, RESULTS_FILE), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+    if over_budget:
+        print("\nПревышен бюджет времени запуска:")
+        for message in over_budget:
+            print(f"  {message}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк времени запуска консольных команд")
+    parser.add_argument("--repeat", type=int, default=20, help="Число запусков каждой команды")
+    args = parser.parse_args()
+    main(args.repeat)
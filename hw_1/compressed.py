@@ -0,0 +1,294 @@
+import importlib
+import io
+import os
+import sys
+
+# Модули распаковки, json, threading и т.п. импортируются при первом использовании:
+# команды hw_1 часто запускаются на несжатых файлах, и время их запуска ограничено
+# бюджетом в benchmark_startup.py
+
+# Сигнатуры сжатых форматов в начале файла
+MAGIC = {
+    "gz": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+}
+# Модули, функция open которых распаковывает соответствующий формат
+OPENERS = {
+    "gz": "gzip",
+    "bz2": "bz2",
+    "xz": "lzma",
+}
+READ_SIZE = 1 << 20
+# Сколько распакованных порций фоновый поток может подготовить заранее
+PREFETCH_CHUNKS = 4
+# Минимальное расстояние между контрольными точками индекса gzip, байт сжатого файла
+GZIP_CHECKPOINT_SPACING = 16 << 20
+# Сколько последних строк хранит индекс gzip для повторных вызовов tail
+TAIL_CACHE_LINES = 1000
+GZIP_INDEX_SUFFIX = ".gzidx"
+
+
+def detect_compression(head):
+    """Формат сжатия по первым байтам файла: "gz", "bz2", "xz" или None."""
+    for name, magic in MAGIC.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def file_compression(path):
+    with open(path, "rb") as f:
+        return detect_compression(f.read(6))
+
+
+class BackgroundReader(io.RawIOBase):
+    """
+    Читает поток stream в фоновом потоке порциями по chunk_size байт.
+
+    Распаковка в zlib, bz2 и lzma отпускает GIL, поэтому, пока вызывающий код
+    считает или нумерует строки, следующие порции уже распаковываются.
+    Очередь ограничена prefetch порциями, так что память не растет.
+    """
+    def __init__(self, stream, chunk_size=READ_SIZE, prefetch=PREFETCH_CHUNKS):
+        import queue
+        import threading
+
+        super().__init__()
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._queue = queue.Queue(maxsize=prefetch)
+        self._stop = threading.Event()
+        self._buffer = b""
+        self._eof = False
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    def _produce(self):
+        try:
+            while not self._stop.is_set():
+                data = self._stream.read(self._chunk_size)
+                self._put(data)
+                if not data:
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item):
+        import queue
+
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if not self._buffer and not self._eof:
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                raise item
+            if not item:
+                self._eof = True
+            self._buffer = item
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._stream.close()
+        super().close()
+
+
+def open_text(path=None, encoding=None):
+    """
+    Открывает файл path (None - стандартный ввод) для чтения текста.
+
+    Сжатые gzip, bz2 и xz файлы распознаются по сигнатуре и распаковываются
+    на лету в фоновом потоке (см. BackgroundReader). Обычные файлы открываются как есть.
+    """
+    if path is None:
+        source = sys.stdin.buffer
+        compression = detect_compression(source.peek(6)[:6]) if hasattr(source, "peek") else None
+        if compression is None:
+            return sys.stdin
+    else:
+        compression = file_compression(path)
+        if compression is None:
+            return open(path, "r", encoding=encoding)
+        source = path
+
+    opener = importlib.import_module(OPENERS[compression]).open
+    stream = BackgroundReader(opener(source, "rb"))
+    return io.TextIOWrapper(io.BufferedReader(stream, READ_SIZE), encoding=encoding or "utf-8")
+
+
+def _last_lines(chunks, num_lines):
+    """Последние num_lines строк из списка байтовых порций, строки разделяются только \\n."""
+    text = b"".join(chunks).decode("utf-8", errors="replace").replace("\r\n", "\n")
+    parts = text.split("\n")
+    lines = [part + "\n" for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines[-num_lines:] if num_lines else []
+
+
+class GzipTailIndex:
+    """
+    Индекс gzip файла для быстрых повторных вызовов tail.
+
+    Хранится рядом с файлом (<файл>.gzidx) и содержит размер и время изменения файла,
+    число строк, последние TAIL_CACHE_LINES строк и контрольные точки - начала
+    gzip-участников не реже чем через GZIP_CHECKPOINT_SPACING байт с числом строк
+    перед ними. Продолжить распаковку с середины участника средствами zlib нельзя,
+    поэтому контрольные точки ставятся только на границах участников (файлы,
+    дописываемые через cat new.gz >> log.gz, состоят из многих участников).
+
+    Если файл не менялся, tail берется из индекса без распаковки; если к нему
+    дописаны новые участники, распаковывается только добавленная часть.
+    Индекс создается только по запросу (tail --index), как и индекс строк;
+    если папка недоступна для записи, он просто не сохраняется.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + GZIP_INDEX_SUFFIX
+        self.data = None
+
+    @classmethod
+    def open(cls, path, create=False):
+        """Индекс файла path или None, если файла-спутника нет и create=False."""
+        if not create and not os.path.exists(path + GZIP_INDEX_SUFFIX):
+            return None
+        return cls(path)
+
+    def _load(self):
+        import json
+
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self):
+        import json
+
+        try:
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            pass
+
+    def _scan(self, f, start, state):
+        """
+        Распаковывает файл с позиции start (начало участника) до конца, обновляя
+        число строк, контрольные точки и хвост в state.
+        """
+        import collections
+        import zlib
+
+        tail = [line.encode("utf-8") for line in state["tail"]]
+        tail_newlines = sum(line.count(b"\n") for line in tail)
+        tail = collections.deque(tail)
+        checkpoints = state["checkpoints"]
+        lines = state["lines"]
+        position = start
+        f.seek(start)
+        data = f.read(READ_SIZE)
+        while data:
+            if len(data) < len(MAGIC["gz"]):
+                data += f.read(READ_SIZE)
+            if not data.startswith(MAGIC["gz"]):
+                break
+            if not checkpoints or position - checkpoints[-1][0] >= GZIP_CHECKPOINT_SPACING:
+                checkpoints.append([position, lines])
+            decompressor = zlib.decompressobj(31)
+            while True:
+                out = decompressor.decompress(data)
+                if out:
+                    newlines = out.count(b"\n")
+                    lines += newlines
+                    tail.append(out)
+                    tail_newlines += newlines
+                    while len(tail) > 1 and tail_newlines - tail[0].count(b"\n") > TAIL_CACHE_LINES:
+                        tail_newlines -= tail.popleft().count(b"\n")
+                if decompressor.eof:
+                    position += len(data) - len(decompressor.unused_data)
+                    data = decompressor.unused_data or f.read(READ_SIZE)
+                    break
+                position += len(data)
+                data = f.read(READ_SIZE)
+                if not data:
+                    raise EOFError("Обрезанный gzip файл")
+
+        tail_lines = _last_lines(tail, TAIL_CACHE_LINES)
+        # Последняя строка без перевода строки тоже выводится tail и считается строкой
+        total_lines = lines + (1 if tail_lines and not tail_lines[-1].endswith("\n") else 0)
+        state.update(lines=lines, total_lines=total_lines, checkpoints=checkpoints, tail=tail_lines, end=position)
+
+    def update(self):
+        """Загружает индекс и приводит его в соответствие с файлом."""
+        stat = os.stat(self.path)
+        data = self._load()
+        if data and data["size"] == stat.st_size and data["mtime_ns"] == stat.st_mtime_ns:
+            self.data = data
+            return
+
+        with open(self.path, "rb") as f:
+            appended = False
+            if data and data["size"] < stat.st_size and data["end"] == data["size"]:
+                f.seek(data["size"])
+                appended = f.read(2) == MAGIC["gz"]
+            if not appended:
+                data = {"lines": 0, "checkpoints": [], "tail": []}
+                self._scan(f, 0, data)
+            else:
+                self._scan(f, data["size"], data)
+        data.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        self.data = data
+        self._save()
+
+    def tail(self, num_lines):
+        """Последние num_lines строк файла."""
+        self.update()
+        if num_lines <= len(self.data["tail"]) or len(self.data["tail"]) >= self.data["total_lines"]:
+            return self.data["tail"][-num_lines:] if num_lines else []
+
+        import collections
+        import gzip
+
+        # Ближайшая контрольная точка, после которой не меньше num_lines строк
+        offset = 0
+        for checkpoint_offset, checkpoint_lines in self.data["checkpoints"]:
+            if self.data["total_lines"] - checkpoint_lines < num_lines:
+                break
+            offset = checkpoint_offset
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            stream = BackgroundReader(gzip.GzipFile(fileobj=f))
+            with io.TextIOWrapper(io.BufferedReader(stream, READ_SIZE), encoding="utf-8") as stream:
+                return list(collections.deque(stream, maxlen=num_lines))
+
+
+def read_last_lines_compressed(path, compression, num_lines, use_index=False):
+    """
+    Последние num_lines строк сжатого файла. Для gzip с индексом (или при use_index,
+    тогда индекс создается) - через GzipTailIndex.
+    """
+    import collections
+
+    index = GzipTailIndex.open(path, create=use_index) if compression == "gz" else None
+    if index is not None:
+        return index.tail(num_lines)
+    with open_text(path, encoding="utf-8") as stream:
+        return list(collections.deque(stream, maxlen=num_lines))
@@ -0,0 +1,17 @@
+import os
+
+
+def plain_paths(argv, max_paths=None):
+    """
+    Быстрый путь разбора аргументов без click.
+
+    Возвращает список путей, если argv состоит только из существующих обычных файлов
+    (без опций, "-", --help, каталогов и специальных файлов) и их не больше max_paths. Иначе возвращает None,
+    и команда разбирает аргументы через click со всеми проверками и сообщениями.
+    """
+    if max_paths is not None and len(argv) > max_paths:
+        return None
+    for arg in argv:
+        if arg.startswith("-") or not os.path.isfile(arg):
+            return None
+    return argv
@@ -0,0 +1,200 @@
+import os
+from array import array
+
+LINE_INDEX_SUFFIX = ".lineidx"
+LINE_INDEX_MAGIC = "LINEIDX3"
+# Заголовок фиксированной длины: массивы за ним читаются по смещению без разбора
+HEADER_SIZE = 64
+READ_SIZE = 1 << 20
+# Сколько байт перед концом проиндексированной части сверяется при дописывании файла
+CHECK_SIZE = 4096
+# Сколько блоков и какого размера сверяется по всей проиндексированной части
+CHECK_SAMPLES = 64
+CHECK_SAMPLE_SIZE = 64
+# Через сколько строк хранится абсолютное смещение строки
+CHECKPOINT_LINES = 256
+
+
+class LineIndex:
+    """
+    Индекс строк файла в файле-спутнике <файл>.lineidx.
+
+    Файл-спутник состоит из заголовка (размер и время изменения файла, конец
+    проиндексированной части, ее хэш и число строк), абсолютных смещений каждой
+    CHECKPOINT_LINES-й строки в array("Q") и длин всех строк в байтах в array("I") -
+    по 4 байта на строку. Если файл вырос, а хэш проиндексированной части не
+    изменился, индекс обновляется чтением добавленного хвоста; если файл изменился,
+    не увеличившись, или хэш не совпал, индекс строится заново.
+
+    Для актуального индекса читается только заголовок: число строк берется из него,
+    а смещение любой строки - из одной контрольной точки и не более
+    CHECKPOINT_LINES длин, прочитанных из файла-спутника по смещению.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + LINE_INDEX_SUFFIX
+        self.size = 0
+        self.mtime_ns = 0
+        self.end = 0
+        self.check = ""
+        self.count = 0
+        # Массивы загружаются только для обновления индекса
+        self.checkpoints = None
+        self.lengths = None
+
+    @classmethod
+    def open(cls, path, create=False):
+        """
+        Индекс файла path, актуальный на текущий момент, или None, если файла-спутника
+        нет и create=False.
+        """
+        index = cls(path)
+        if not index._load() and not create:
+            return None
+        index.update()
+        return index
+
+    def _load(self):
+        """Читает заголовок файла-спутника."""
+        try:
+            with open(self.index_path, "rb") as f:
+                header = f.read(HEADER_SIZE).decode("ascii").split()
+        except (OSError, UnicodeDecodeError):
+            return False
+        if len(header) != 6 or header[0] != LINE_INDEX_MAGIC:
+            return False
+        self.size, self.mtime_ns, self.end = int(header[1]), int(header[2]), int(header[3])
+        self.check, self.count = header[4], int(header[5])
+        return True
+
+    def _load_arrays(self):
+        """Читает массивы файла-спутника целиком (нужно только для обновления индекса)."""
+        self.checkpoints, self.lengths = array("Q"), array("I")
+        try:
+            with open(self.index_path, "rb") as f:
+                f.seek(HEADER_SIZE)
+                self.checkpoints.fromfile(f, self._checkpoint_count())
+                self.lengths.fromfile(f, self.count)
+        except (OSError, EOFError):
+            self._reset()
+
+    def _reset(self):
+        self.checkpoints, self.lengths = array("Q"), array("I")
+        self.end = 0
+        self.count = 0
+
+    def _checkpoint_count(self):
+        return (self.count + CHECKPOINT_LINES - 1) // CHECKPOINT_LINES
+
+    def _save(self):
+        header = f"{LINE_INDEX_MAGIC} {self.size} {self.mtime_ns} {self.end} {self.check} {self.count}"
+        try:
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(header.encode("ascii").ljust(HEADER_SIZE - 1) + b"\n")
+                self.checkpoints.tofile(f)
+                self.lengths.tofile(f)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            pass
+
+    def _check_hash(self, f):
+        """
+        CRC32 проиндексированной части по выборке: CHECK_SAMPLES блоков, равномерно
+        расставленных от начала файла, и последние CHECK_SIZE байт. Хэш всей части
+        сделал бы дописывание таким же дорогим, как построение индекса заново.
+        """
+        import zlib
+
+        crc = 0
+        for sample in range(CHECK_SAMPLES):
+            start = self.end * sample // CHECK_SAMPLES
+            f.seek(start)
+            crc = zlib.crc32(f.read(min(CHECK_SAMPLE_SIZE, self.end - start)), crc)
+        start = max(0, self.end - CHECK_SIZE)
+        f.seek(start)
+        return format(zlib.crc32(f.read(self.end - start), crc), "08x")
+
+    def _extend_checkpoints(self):
+        """Добавляет контрольные точки для строк, проиндексированных после последней точки."""
+        line = len(self.checkpoints) * CHECKPOINT_LINES
+        offset = 0
+        if self.checkpoints:
+            offset = self.checkpoints[-1] + sum(self.lengths[line - CHECKPOINT_LINES:line])
+        while line < self.count:
+            self.checkpoints.append(offset)
+            offset += sum(self.lengths[line:line + CHECKPOINT_LINES])
+            line += CHECKPOINT_LINES
+
+    def update(self):
+        """Приводит индекс в соответствие с файлом, дочитывая только дописанную часть."""
+        stat = os.stat(self.path)
+        if stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns:
+            return
+
+        self._load_arrays()
+        with open(self.path, "rb") as f:
+            # Изменение без роста файла - правка на месте или усечение, а не дописывание
+            if stat.st_size <= self.size or self._check_hash(f) != self.check:
+                self._reset()
+
+            f.seek(self.end)
+            carry = 0
+            while True:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    break
+                parts = chunk.split(b"\n")
+                if len(parts) > 1:
+                    self.lengths.append(carry + len(parts[0]) + 1)
+                    self.lengths.extend(len(part) + 1 for part in parts[1:-1])
+                    carry = 0
+                carry += len(parts[-1])
+            self.end = stat.st_size - carry
+            self.check = self._check_hash(f)
+
+        self.count = len(self.lengths)
+        self._extend_checkpoints()
+        self.size, self.mtime_ns = stat.st_size, stat.st_mtime_ns
+        self._save()
+
+    @property
+    def line_count(self):
+        """Число переводов строки в файле, как у wc -l."""
+        return self.count
+
+    @property
+    def total_lines(self):
+        """Число строк с учетом последней строки без перевода строки."""
+        return self.count + (1 if self.size > self.end else 0)
+
+    def line_offset(self, line):
+        """Смещение в байтах начала строки line (с нуля) за O(CHECKPOINT_LINES)."""
+        if line >= self.count:
+            return self.end if line == self.count else self.size
+
+        block = line // CHECKPOINT_LINES
+        first = block * CHECKPOINT_LINES
+        if self.lengths is not None:
+            return self.checkpoints[block] + sum(self.lengths[first:line])
+
+        checkpoint, lengths = array("Q"), array("I")
+        with open(self.index_path, "rb") as f:
+            f.seek(HEADER_SIZE + block * checkpoint.itemsize)
+            checkpoint.fromfile(f, 1)
+            f.seek(HEADER_SIZE + self._checkpoint_count() * checkpoint.itemsize + first * lengths.itemsize)
+            lengths.fromfile(f, line - first)
+        return checkpoint[0] + sum(lengths)
+
+    def read_lines(self, start, stop=None):
+        """Генератор строк с номерами из [start, stop) (с нуля): один seek и потоковое чтение."""
+        total = self.total_lines
+        stop = total if stop is None else min(stop, total)
+        start = max(0, start)
+        if start >= stop:
+            return
+
+        with open(self.path, "rb") as f:
+            f.seek(self.line_offset(start))
+            for _, raw in zip(range(stop - start), f):
+                yield raw.decode("utf-8", errors="replace").replace("\r\n", "\n")
@@ -1,17 +1,77 @@
 import sys
 
-import click
+from hw_1.compressed import file_compression, open_text
+from hw_1.fast_cli import plain_paths
 
 
-@click.command()
-@click.argument("file", type=click.File("r"), required=False)
-def nl_command(file):
-    input_stream = file if file else sys.stdin
+def parse_range(text):
+    """Диапазон строк "START:END" (с единицы, включительно; любая граница может быть пустой)."""
+    start, _, end = text.partition(":")
+    start = int(start) if start else 1
+    end = int(end) if end else None
+    if start < 1 or (end is not None and end < start):
+        raise ValueError(f"Неверный диапазон строк: {text}")
+    return start, end
+
+
+def nl(path=None, start=1, end=None, use_index=False):
+    if path is not None and (start > 1 or end is not None) and file_compression(path) is None:
+        from hw_1.line_index import LineIndex
+
+        index = LineIndex.open(path, create=use_index)
+        if index is not None:
+            for line_number, line in enumerate(index.read_lines(start - 1, end), start):
+                print(f"{line_number:6d}\t{line}", end="")
+            return
+
+    input_stream = open_text(path)
 
     line_number = 1
     for line in input_stream:
-        print(f"{line_number:6d}\t{line}", end="")
+        if end is not None and line_number > end:
+            break
+        if line_number >= start:
+            print(f"{line_number:6d}\t{line}", end="")
         line_number += 1
 
+    if input_stream is not sys.stdin:
+        input_stream.close()
+
+
+def _click_command():
+    # click импортируется только для вызовов, которые не разобрал быстрый путь
+    import click
+
+    def convert_range(ctx, param, value):
+        try:
+            return parse_range(value) if value else (1, None)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+
+    @click.command(name="nl_command")
+    @click.option(
+        "-r", "--range", "line_range", callback=convert_range,
+        help="Выводить только строки START:END (с единицы, включительно)"
+    )
+    @click.option(
+        "--index", "use_index", is_flag=True,
+        help="Создавать и обновлять индекс строк <файл>.lineidx для перехода к диапазону без чтения файла"
+    )
+    @click.argument("file", type=click.Path(exists=True, dir_okay=False, allow_dash=True), required=False)
+    def command(file, line_range, use_index):
+        nl(None if file == "-" else file, line_range[0], line_range[1], use_index)
+
+    return command
+
+
+def nl_command(args=None):
+    argv = sys.argv[1:] if args is None else list(args)
+    paths = plain_paths(argv, max_paths=1)
+    if paths is None:
+        _click_command()(argv, prog_name="nl_command")
+    else:
+        nl(paths[0] if paths else None)
+
+
 if __name__ == "__main__":
     nl_command()
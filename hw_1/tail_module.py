@@ -1,33 +1,42 @@
 import sys
 
-import click
+from hw_1.compressed import file_compression, open_text, read_last_lines_compressed
+from hw_1.fast_cli import plain_paths
 
 
-def read_last_lines(file, num_lines=10):
+def read_last_lines(file, num_lines=10, use_index=False):
     try:
+        compression = file_compression(file)
+        if compression is not None:
+            return read_last_lines_compressed(file, compression, num_lines, use_index)
+        from hw_1.line_index import LineIndex
+
+        index = LineIndex.open(file, create=use_index)
+        if index is not None:
+            return list(index.read_lines(index.total_lines - num_lines))
         with open(file, "r", encoding="utf-8") as f:
             lines = f.readlines()
-            return lines[-num_lines:] if len(lines) >= num_lines else lines
+            return lines[len(lines) - num_lines:] if len(lines) >= num_lines else lines
     except Exception as e:
         print(f"Ошибка при чтении файла {file}: {e}", file=sys.stderr)
         return []
 
 
-def print_last_lines(file, num_lines=10, print_header=False):
+def print_last_lines(file, num_lines=10, print_header=False, use_index=False):
     if print_header:
         print(f"==> {file} <==")
 
-    lines = read_last_lines(file, num_lines)
+    lines = read_last_lines(file, num_lines, use_index)
     for line in lines:
         print(line, end="")
 
 
-@click.command()
-@click.argument("files", nargs=-1, type=click.Path(exists=True))
-def tail_command(files):
+def tail(files, num_lines=None, use_index=False):
     if not files:
-        stdin_lines = sys.stdin.readlines()
-        for line in stdin_lines[-17:]:
+        stdin_lines = open_text().readlines()
+        if num_lines is None:
+            num_lines = 17
+        for line in stdin_lines[max(len(stdin_lines) - num_lines, 0):]:
             print(line, end="")
     else:
         for i, file in enumerate(files):
@@ -36,7 +45,33 @@ def tail_command(files):
             if i > 0 and print_header:
                 print()
 
-            print_last_lines(file, 10, print_header)
+            print_last_lines(file, 10 if num_lines is None else num_lines, print_header, use_index)
+
+
+def _click_command():
+    # click импортируется только для вызовов, которые не разобрал быстрый путь
+    import click
+
+    @click.command(name="tail_command")
+    @click.option("-n", "--lines", "num_lines", type=click.IntRange(min=0), help="Сколько последних строк выводить")
+    @click.option(
+        "--index", "use_index", is_flag=True,
+        help="Создавать и обновлять индекс <файл>.lineidx (для gzip - <файл>.gzidx), чтобы читать только хвост файла"
+    )
+    @click.argument("files", nargs=-1, type=click.Path(exists=True))
+    def command(files, num_lines, use_index):
+        tail(files, num_lines, use_index)
+
+    return command
+
+
+def tail_command(args=None):
+    argv = sys.argv[1:] if args is None else list(args)
+    paths = plain_paths(argv)
+    if paths is None:
+        _click_command()(argv, prog_name="tail_command")
+    else:
+        tail(paths)
 
 
 if __name__ == "__main__":
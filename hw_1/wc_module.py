@@ -1,6 +1,7 @@
 import sys
 
-import click
+from hw_1.compressed import READ_SIZE, file_compression, open_text
+from hw_1.fast_cli import plain_paths
 
 
 def count_stats(content):
@@ -10,25 +11,76 @@ def count_stats(content):
     return line_count, word_count, byte_count
 
 
+def count_stream_stats(stream):
+    """
+    Подсчет по потоку порциями по READ_SIZE символов, без чтения файла целиком.
+    Слово, разрезанное границей порций, учитывается один раз.
+    """
+    line_count, word_count, byte_count = 0, 0, 0
+    previous_ends_in_word = False
+    while True:
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            break
+        lines, words, bytes_count = count_stats(chunk)
+        if previous_ends_in_word and not chunk[0].isspace():
+            words -= 1
+        line_count += lines
+        word_count += words
+        byte_count += bytes_count
+        previous_ends_in_word = not chunk[-1].isspace()
+    return line_count, word_count, byte_count
+
+
 def process_file(file_path):
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        stats = count_stats(content)
+        with open_text(file_path, encoding="utf-8") as f:
+            stats = count_stream_stats(f)
         return stats
     except Exception as e:
         print(f"wc: {file_path}: {str(e)}", file=sys.stderr)
         return 0, 0, 0
 
 
-@click.command()
-@click.argument("files", nargs=-1, type=click.Path(exists=True))
-def wc_command(files):
+def count_lines(file_path, use_index=False):
+    """
+    Число строк файла. Для несжатого файла с индексом строк (или при use_index,
+    тогда индекс создается) берется из индекса без чтения файла.
+    """
+    try:
+        if file_compression(file_path) is None:
+            from hw_1.line_index import LineIndex
+
+            index = LineIndex.open(file_path, create=use_index)
+            if index is not None:
+                return index.line_count
+        with open_text(file_path, encoding="utf-8") as f:
+            return sum(chunk.count("\n") for chunk in iter(lambda: f.read(READ_SIZE), ""))
+    except Exception as e:
+        print(f"wc: {file_path}: {str(e)}", file=sys.stderr)
+        return 0
+
+
+def wc_lines(files, use_index=False):
+    if not files:
+        print(f"{count_stream_stats(open_text())[0]:8}")
+        return
+
+    total_lines = 0
+    for file_path in files:
+        lines = count_lines(file_path, use_index)
+        print(f"{lines:8} {file_path}")
+        total_lines += lines
+
+    if len(files) > 1:
+        print(f"{total_lines:8} total")
+
+
+def wc(files):
     total_lines, total_words, total_bytes = 0, 0, 0
 
     if not files:
-        content = sys.stdin.read()
-        lines, words, bytes_count = count_stats(content)
+        lines, words, bytes_count = count_stream_stats(open_text())
         print(f"{lines:8} {words:8} {bytes_count:8}")
         return
 
@@ -44,5 +96,34 @@ def wc_command(files):
         print(f"{total_lines:8} {total_words:8} {total_bytes:8} total")
 
 
+def _click_command():
+    # click импортируется только для вызовов, которые не разобрал быстрый путь
+    import click
+
+    @click.command(name="wc_command")
+    @click.option("-l", "--lines", "lines_only", is_flag=True, help="Выводить только число строк")
+    @click.option(
+        "--index", "use_index", is_flag=True,
+        help="Создавать и обновлять индекс строк <файл>.lineidx для мгновенного -l"
+    )
+    @click.argument("files", nargs=-1, type=click.Path(exists=True))
+    def command(files, lines_only, use_index):
+        if lines_only:
+            wc_lines(files, use_index)
+        else:
+            wc(files)
+
+    return command
+
+
+def wc_command(args=None):
+    argv = sys.argv[1:] if args is None else list(args)
+    paths = plain_paths(argv)
+    if paths is None:
+        _click_command()(argv, prog_name="wc_command")
+    else:
+        wc(paths)
+
+
 if __name__ == "__main__":
     wc_command()
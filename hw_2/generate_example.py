@@ -1,17 +1,35 @@
+import hashlib
+import json
 import os
+import re
 import shutil
 import subprocess
+import time
 
 from latex_generator_itmo_kulyaskin import generate_image, generate_table
 
+# Команду можно подменить переменной окружения, например заглушкой в тестах
+PDFLATEX = os.environ.get("PDFLATEX", "pdflatex")
+# Таймаут одного прохода pdflatex, секунд
+PDFLATEX_TIMEOUT = 120
+MAX_PASSES = 5
+# Вспомогательные файлы, изменение которых после прохода требует еще одного прохода
+AUX_EXTENSIONS = (".aux", ".toc", ".lof", ".lot", ".out")
+# Расширения, которые pdflatex пробует для \includegraphics без расширения
+GRAPHICS_EXTENSIONS = ("", ".pdf", ".png", ".jpg", ".jpeg")
+DEFAULT_TITLE = "Пример генерации таблицы и изображения"
+BATCH_OUTPUT = "hw_2/artifacts/reports"
+ASSET_PATTERN = re.compile(r"\\(includegraphics|input|include)(?:\[[^\]]*\])?\{([^}]+)\}")
 
-def save_to_tex_file(latex_content, filename):
+
+def save_to_tex_file(latex_content, filename, title=DEFAULT_TITLE):
     """
     Сохраняет LaTeX контент в файл с добавлением преамбулы и окружения документа.
     
     Аргументы:
         latex_content (str): LaTeX контент для сохранения.
         filename (str): Имя файла, в который нужно сохранить контент.
+        title (str, optional): Заголовок документа (LaTeX).
     """
     preamble = """\\documentclass{article}
 \\usepackage[utf8]{inputenc}
@@ -23,7 +41,7 @@ def save_to_tex_file(latex_content, filename):
 \\usepackage{geometry}
 \\geometry{a4paper, margin=1in}
 
-\\title{Пример генерации таблицы и изображения}
+\\title{""" + title + """}
 \\author{Автоматический генератор LaTeX}
 \\date{\\today}
 
@@ -36,48 +54,318 @@ def save_to_tex_file(latex_content, filename):
 \\end{document}"""
     
     full_content = preamble + latex_content + closing
-    
+
+    # Не перезаписываем неизменившийся файл, чтобы не трогать его время изменения
+    if os.path.exists(filename):
+        with open(filename, encoding='utf-8') as file:
+            if file.read() == full_content:
+                return
+
     with open(filename, 'w', encoding='utf-8') as file:
         file.write(full_content)
 
-def generate_pdf(tex_file):
+def _hash_file(path):
+    """Возвращает sha256 содержимого файла или None, если файла нет."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_assets(tex_file):
+    """
+    Находит файлы, подключаемые в TeX файле через \\includegraphics, \\input и \\include.
+
+    Возвращает:
+        list: Пути к файлам относительно папки TeX файла, в порядке появления.
+    """
+    tex_dir = os.path.dirname(tex_file)
+    with open(tex_file, encoding='utf-8') as file:
+        content = file.read()
+
+    assets = []
+    for command, name in ASSET_PATTERN.findall(content):
+        extensions = GRAPHICS_EXTENSIONS if command == "includegraphics" else ("", ".tex")
+        candidates = [name + ext for ext in extensions]
+        found = next((c for c in candidates if os.path.isfile(os.path.join(tex_dir, c))), candidates[0])
+        if found not in assets:
+            assets.append(found)
+    return assets
+
+
+def build_hash(tex_file):
+    """Хэш TeX файла вместе с содержимым всех подключаемых в нем файлов."""
+    tex_dir = os.path.dirname(tex_file)
+    digest = hashlib.sha256()
+    digest.update(_hash_file(tex_file).encode())
+    for asset in find_assets(tex_file):
+        digest.update(f"\0{asset}\0{_hash_file(os.path.join(tex_dir, asset))}".encode())
+    return digest.hexdigest()
+
+
+def _aux_state(base):
+    return {ext: _hash_file(base + ext) for ext in AUX_EXTENSIONS}
+
+
+def _run_passes(tex_file, pdflatex, timeout, max_passes):
+    """
+    Запускает pdflatex, пока вспомогательные файлы не перестанут меняться.
+
+    Возвращает:
+        int: Число сделанных проходов.
+
+    Исключения:
+        RuntimeError: pdflatex завершился с ошибкой или не уложился в timeout.
+    """
+    tex_dir = os.path.dirname(tex_file)
+    base = os.path.splitext(tex_file)[0]
+    # pdflatex запускается из папки TeX файла, поэтому относительный путь к команде
+    # разрешается заранее относительно текущей папки
+    command = shutil.which(pdflatex)
+    command = os.path.abspath(command) if command else pdflatex
+    aux_before = _aux_state(base)
+    for passes in range(1, max_passes + 1):
+        try:
+            result = subprocess.run(
+                [command, '-interaction=nonstopmode', os.path.basename(tex_file)],
+                cwd=tex_dir or None,
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            raise RuntimeError(f"pdflatex не завершился за {timeout} сек")
+
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr or result.stdout[-2000:])
+
+        aux_after = _aux_state(base)
+        if aux_after == aux_before:
+            break
+        aux_before = aux_after
+    return passes
+
+
+def generate_pdf(tex_file, pdflatex=PDFLATEX, timeout=PDFLATEX_TIMEOUT, max_passes=MAX_PASSES, force=False):
     """
     Генерирует PDF из TeX файла с помощью pdflatex.
-    
+
+    Сборка инкрементальная: хэш TeX файла и подключаемых в нем файлов (изображений,
+    \\input) сохраняется рядом в <имя>.build.json, и если он не изменился, а PDF
+    на месте, pdflatex не запускается. Проходов делается столько, сколько нужно,
+    чтобы .aux и другие вспомогательные файлы перестали меняться (но не больше
+    max_passes), так что перекрестные ссылки в PDF актуальны.
+
     Аргументы:
         tex_file (str): Путь к TeX файлу.
-    
+        pdflatex (str, optional): Команда pdflatex (можно подставить заглушку).
+        timeout (float, optional): Таймаут одного прохода, секунд.
+        max_passes (int, optional): Максимальное число проходов.
+        force (bool, optional): Собрать заново, даже если ничего не изменилось.
+
     Возвращает:
         bool: True, если PDF был успешно сгенерирован, иначе False.
     """
     try:
-        tex_dir = os.path.dirname(tex_file)
-        
+        base = os.path.splitext(tex_file)[0]
+        pdf_file = base + ".pdf"
+        cache_file = base + ".build.json"
 
-        if not shutil.which('pdflatex'):
+        if not shutil.which(pdflatex):
             print("ВНИМАНИЕ: pdflatex не найден. PDF не может быть сгенерирован автоматически.")
             print("Вы можете вручную скомпилировать .tex файл после установки LaTeX дистрибутива.")
             return False
-        
-        result = subprocess.run(
-            ['pdflatex', '-interaction=nonstopmode', os.path.basename(tex_file)],
-            cwd=tex_dir,
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            print(f"Ошибка при генерации PDF: {result.stderr}")
+
+        current_hash = build_hash(tex_file)
+        if not force and os.path.exists(pdf_file) and os.path.exists(cache_file):
+            with open(cache_file, encoding='utf-8') as file:
+                if json.load(file).get("hash") == current_hash:
+                    print(f"PDF не требует пересборки: {pdf_file}")
+                    return True
+
+        # Неудачная сборка не должна оставить запись о том, что PDF актуален
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+
+        try:
+            passes = _run_passes(tex_file, pdflatex, timeout, max_passes)
+        except RuntimeError as e:
+            print(f"Ошибка при генерации PDF: {e}")
             return False
-        
-        print(f"PDF успешно сгенерирован: {tex_file.replace('.tex', '.pdf')}")
+
+        with open(cache_file, 'w', encoding='utf-8') as file:
+            json.dump({"hash": current_hash, "passes": passes}, file)
+
+        print(f"PDF успешно сгенерирован за {passes} проход(а): {pdf_file}")
         return True
-    
+
     except Exception as e:
         print(f"Произошла ошибка при генерации PDF: {e}")
         return False
 
-def main():
+def render_report(spec):
+    """
+    Собирает LaTeX контент отчета по его описанию.
+
+    Аргументы:
+        spec (dict): Описание отчета. Ключ "sections" - список разделов, у каждого
+            "title" и "text" (LaTeX), а также "table" (двумерный список) или "image"
+            (путь к изображению) с необязательными "caption", "label", "width".
+
+    Возвращает:
+        str: LaTeX контент для save_to_tex_file.
+    """
+    parts = []
+    for section in spec["sections"]:
+        body = ""
+        if "table" in section:
+            body = generate_table(section["table"], caption=section.get("caption"), label=section.get("label"))
+        elif "image" in section:
+            body = generate_image(
+                section["image"],
+                caption=section.get("caption"),
+                label=section.get("label"),
+                width=section.get("width")
+            )
+        parts.append(f"\\section{{{section['title']}}}\n\n{section.get('text', '')}\n\n{body}")
+    return "\n\n".join(parts)
+
+
+def _report_assets(spec):
+    """
+    Пути изображений отчета относительно assets_dir. Абсолютные пути и пути с ..
+    запрещены: изображение копируется по тому же пути внутрь папки сборки и не должно
+    выходить за ее пределы.
+    """
+    assets = []
+    for section in spec["sections"]:
+        if "image" not in section:
+            continue
+        asset = os.path.normpath(section["image"])
+        if os.path.isabs(asset) or os.path.splitdrive(asset)[0] or asset.split(os.sep)[0] == os.pardir:
+            raise ValueError(f"Путь к изображению должен быть относительным и без ..: {section['image']}")
+        assets.append(asset)
+    return assets
+
+
+def _report_name(spec):
+    """
+    Имя отчета из описания. Имя становится именем файлов в output_dir и префиксом
+    временной папки, поэтому допускается только простое имя файла без папок.
+    """
+    name = spec["name"]
+    if not isinstance(name, str) or name in ("", os.curdir, os.pardir) or os.path.basename(name) != name \
+            or (os.altsep and os.altsep in name):
+        raise ValueError(f"Имя отчета должно быть простым именем файла без папок: {name!r}")
+    return name
+
+
+def build_report(spec, output_dir, assets_dir=".", pdflatex=PDFLATEX, timeout=PDFLATEX_TIMEOUT,
+                 max_passes=MAX_PASSES):
+    """
+    Собирает один отчет из пакета в отдельной временной папке.
+
+    TeX генерируется в процессе, изображения копируются во временную папку,
+    готовый PDF переносится в output_dir. Если хэш TeX и изображений совпадает
+    с сохраненным в output_dir/<имя>.build.json и PDF на месте, pdflatex не запускается.
+    При ошибке в output_dir копируется лог pdflatex.
+
+    Возвращает:
+        dict: name, ok, cached, passes, seconds и error для неудачной сборки.
+    """
+    import tempfile
+
+    name = _report_name(spec)
+    start = time.perf_counter()
+    result = {"name": name, "ok": False, "cached": False, "passes": 0}
+    pdf_file = os.path.join(output_dir, name + ".pdf")
+    cache_file = os.path.join(output_dir, name + ".build.json")
+
+    with tempfile.TemporaryDirectory(prefix=f"{name}_") as build_dir:
+        try:
+            for asset in _report_assets(spec):
+                target = os.path.join(build_dir, asset)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy(os.path.join(assets_dir, asset), target)
+            tex_file = os.path.join(build_dir, name + ".tex")
+            save_to_tex_file(render_report(spec), tex_file, spec.get("title", DEFAULT_TITLE))
+
+            current_hash = build_hash(tex_file)
+            if os.path.exists(pdf_file) and os.path.exists(cache_file):
+                with open(cache_file, encoding='utf-8') as file:
+                    if json.load(file).get("hash") == current_hash:
+                        result.update(ok=True, cached=True)
+            if not result["cached"]:
+                result["passes"] = _run_passes(tex_file, pdflatex, timeout, max_passes)
+                shutil.copy(os.path.join(build_dir, name + ".pdf"), pdf_file)
+                with open(cache_file, 'w', encoding='utf-8') as file:
+                    json.dump({"hash": current_hash, "passes": result["passes"]}, file)
+                result["ok"] = True
+        except Exception as e:
+            result["error"] = str(e)
+            log_file = os.path.join(build_dir, name + ".log")
+            if os.path.exists(log_file):
+                shutil.copy(log_file, os.path.join(output_dir, name + ".log"))
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def build_batch(specs, output_dir=BATCH_OUTPUT, assets_dir=".", jobs=None, pdflatex=PDFLATEX,
+                timeout=PDFLATEX_TIMEOUT, max_passes=MAX_PASSES):
+    """
+    Параллельная сборка пакета отчетов.
+
+    Каждый отчет собирается функцией build_report в своей временной папке, поэтому
+    одновременные запуски pdflatex не делят .aux и .log. Одновременно работает не
+    больше jobs сборок (по умолчанию - число процессоров). Итоги по каждому отчету
+    пишутся в output_dir/batch_report.json.
+
+    Возвращает:
+        list: Результаты build_report в порядке specs.
+    """
+    # Импорты только пакетного режима: generate_latex запускается часто, и на
+    # обычный вызов main они не должны тратить время запуска
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    names = [_report_name(spec) for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("Имена отчетов в пакете должны быть уникальными")
+    if not shutil.which(pdflatex):
+        print("ВНИМАНИЕ: pdflatex не найден. PDF не может быть сгенерирован автоматически.")
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+    results = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(build_report, spec, output_dir, assets_dir, pdflatex, timeout, max_passes)
+            for spec in specs
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["name"]] = result
+            status = "из кэша" if result["cached"] else ("готов" if result["ok"] else "ОШИБКА")
+            print(f"[{len(results)}/{len(specs)}] {result['name']}: {status}, {result['seconds']:.2f} сек")
+
+    ordered = [results[name] for name in names]
+    with open(os.path.join(output_dir, "batch_report.json"), 'w', encoding='utf-8') as file:
+        json.dump(ordered, file, ensure_ascii=False, indent=2)
+
+    failed = [result for result in ordered if not result["ok"]]
+    print(f"Собрано отчетов: {len(ordered) - len(failed)} из {len(ordered)} за {time.perf_counter() - start:.2f} сек")
+    for result in failed:
+        print(f"  {result['name']}: {result['error'].strip().splitlines()[-1] if result['error'].strip() else 'ошибка'}")
+    return ordered
+
+
+def build_example():
+    """Пример: таблица и изображение в hw_2/artifacts/example.tex и PDF."""
 
     sample_data = [
         ["Имя", "Возраст", "Город"],
@@ -86,31 +374,29 @@ def main():
         ["Алексей", "22", "Казань"],
         ["Екатерина", "28", "Новосибирск"]
     ]
-    
-    latex_table = generate_table(
-        sample_data,
-        caption="Пример таблицы с данными пользователей",
-        label="tab:users"
-    )
-    
-    latex_image = generate_image(
-        "cat.png",
-        caption="Котик",
-        label="fig:cat",
-        width="0.8\\textwidth"
-    )
-    
-    latex_content = """\\section{Пример таблицы}
-
-Ниже представлена таблица, сгенерированная с помощью функции generate\\_table:
-
-""" + latex_table + """
 
-\\section{Пример изображения}
+    spec = {
+        "name": "example",
+        "sections": [
+            {
+                "title": "Пример таблицы",
+                "text": "Ниже представлена таблица, сгенерированная с помощью функции generate\\_table:",
+                "table": sample_data,
+                "caption": "Пример таблицы с данными пользователей",
+                "label": "tab:users"
+            },
+            {
+                "title": "Пример изображения",
+                "text": "Ниже представлено изображение, сгенерированное с помощью функции generate\\_image:",
+                "image": "cat.png",
+                "caption": "Котик",
+                "label": "fig:cat",
+                "width": "0.8\\textwidth"
+            }
+        ]
+    }
 
-Ниже представлено изображение, сгенерированное с помощью функции generate\\_image:
-
-""" + latex_image
+    latex_content = render_report(spec)
     
     tex_file = "hw_2/artifacts/example.tex"
     
@@ -119,6 +405,36 @@ def main():
     print(f"LaTeX файл успешно сгенерирован: {tex_file}")
     
     generate_pdf(tex_file)
-    
+
+
+def main(argv=None):
+    """
+    Точка входа generate_latex: без аргументов собирает пример (build_example),
+    с --batch - пакет отчетов из JSON файла (build_batch).
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Генерация LaTeX документов и PDF")
+    parser.add_argument(
+        "--batch",
+        help="JSON файл со списком описаний отчетов (см. render_report) для параллельной сборки"
+    )
+    parser.add_argument("--output", default=BATCH_OUTPUT, help="Папка для PDF пакетной сборки")
+    parser.add_argument("--assets", help="Папка с изображениями отчетов (по умолчанию - папка файла --batch)")
+    parser.add_argument("--jobs", type=int, default=None, help="Число одновременных сборок")
+    parser.add_argument("--timeout", type=float, default=PDFLATEX_TIMEOUT, help="Таймаут одного прохода pdflatex, сек")
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        with open(args.batch, encoding='utf-8') as file:
+            specs = json.load(file)
+        build_batch(
+            specs, args.output, args.assets or os.path.dirname(os.path.abspath(args.batch)),
+            args.jobs, timeout=args.timeout
+        )
+    else:
+        build_example()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,5 +1,11 @@
 import numpy as np
 
+# Модуль запускается и как скрипт из hw_3, и как часть пакета (import hw_3.matrix)
+try:
+    from .profiler import elementwise_flops, instrumented, matmul_flops, operation
+except ImportError:
+    from profiler import elementwise_flops, instrumented, matmul_flops, operation
+
 # Глобальный кэш для хранения результатов матричного умножения
 matrix_mult_cache = {}
 
@@ -46,6 +52,7 @@ class HashMixin:
         return True    
 
 
+@instrumented
 class Matrix(HashMixin):
     def __init__(self, data):
         """
@@ -84,6 +91,7 @@ class Matrix(HashMixin):
         return f"Matrix({self.data})"
     
     
+    @operation("add", elementwise_flops)
     def __add__(self, other):
         """
         Перегрузка оператора + для сложения матриц
@@ -105,6 +113,7 @@ class Matrix(HashMixin):
                 
         return Matrix(result)
     
+    @operation("mul", elementwise_flops)
     def __mul__(self, other):
         """
         Перегрузка оператора * для поэлементного умножения матриц
@@ -126,6 +135,7 @@ class Matrix(HashMixin):
                 
         return Matrix(result)
     
+    @operation("matmul", matmul_flops)
     def __matmul__(self, other, use_cache=True):
         """
         Перегрузка оператора @ для матричного умножения с кэшированием
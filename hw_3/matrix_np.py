@@ -1,8 +1,25 @@
+import warnings
+
 import numpy as np
 
+# scipy не входит в зависимости проекта: без него решение идет через обратную матрицу
+# с уточнением, а не через хранимые множители разложения
+try:
+    import scipy.linalg
+except ImportError:
+    scipy = None
+
+# Модуль запускается и как скрипт из hw_3, и как часть пакета (import hw_3.matrix)
+try:
+    from .profiler import elementwise_flops, instrumented, matmul_flops, operation, power_flops
+except ImportError:
+    from profiler import elementwise_flops, instrumented, matmul_flops, operation, power_flops
+
 
+@instrumented
 class ArithmeticMixin:
     """Примесь для арифметических операций"""
+    @operation("add", elementwise_flops)
     def __add__(self, other):
         """Операция сложения с другой матрицей"""
         if not isinstance(other, MatrixNP):
@@ -11,6 +28,7 @@ class ArithmeticMixin:
             raise ValueError(f"Размерности матриц не совпадают: {self.data.shape} и {other.data.shape}")
         return MatrixNP(self.data + other.data)
     
+    @operation("sub", elementwise_flops)
     def __sub__(self, other):
         """Операция вычитания другой матрицы"""
         if not isinstance(other, MatrixNP):
@@ -19,6 +37,7 @@ class ArithmeticMixin:
             raise ValueError(f"Размерности матриц не совпадают: {self.data.shape} и {other.data.shape}")
         return MatrixNP(self.data - other.data)
     
+    @operation("mul", elementwise_flops)
     def __mul__(self, other):
         """Операция поэлементного умножения с другой матрицей или на скаляр"""
         if isinstance(other, MatrixNP):
@@ -30,12 +49,14 @@ class ArithmeticMixin:
         else:
             raise TypeError("Умножение поддерживается только с матрицей или числом")
     
+    @operation("rmul", elementwise_flops)
     def __rmul__(self, other):
         """Операция умножения на скаляр справа"""
         if isinstance(other, (int, float)):
             return MatrixNP(other * self.data)
         return NotImplemented
     
+    @operation("truediv", elementwise_flops)
     def __truediv__(self, other):
         """Операция деления матрицы на матрицу или скаляр"""
         if isinstance(other, MatrixNP):
@@ -49,6 +70,7 @@ class ArithmeticMixin:
         else:
             raise TypeError("Деление поддерживается только с матрицей или числом")
     
+    @operation("matmul", matmul_flops)
     def __matmul__(self, other):
         """Операция матричного умножения с другой матрицей"""
         if not isinstance(other, MatrixNP):
@@ -60,6 +82,7 @@ class ArithmeticMixin:
             )
         return MatrixNP(self.data @ other.data)
     
+    @operation("pow", power_flops)
     def __pow__(self, power):
         """Возведение матрицы в степень"""
         if not isinstance(power, int):
@@ -87,10 +110,190 @@ class ArithmeticMixin:
         
         return MatrixNP(result)
     
+    @operation("transpose")
     def transpose(self):
         """Транспонирование матрицы"""
         return MatrixNP(self.data.T)
 
+    def _assign(self, result):
+        """Заменяет данные матрицы результатом операции на месте и сбрасывает кэш разложений"""
+        self.data = result.data
+        self._invalidate()
+        return self
+
+    def __iadd__(self, other):
+        """Сложение на месте"""
+        return self._assign(self + other)
+
+    def __isub__(self, other):
+        """Вычитание на месте"""
+        return self._assign(self - other)
+
+    def __imul__(self, other):
+        """Поэлементное умножение или умножение на скаляр на месте"""
+        return self._assign(self * other)
+
+    def __itruediv__(self, other):
+        """Деление на месте"""
+        return self._assign(self / other)
+
+    def __imatmul__(self, other):
+        """Матричное умножение на месте"""
+        return self._assign(self @ other)
+
+
+class LinalgMixin:
+    """
+    Примесь для решения линейных систем.
+
+    Разложение матрицы вычисляется один раз при первом обращении и хранится в объекте,
+    поэтому повторные solve/inv/det с той же матрицей не раскладывают ее заново.
+    Кэш сбрасывается в set_element и операциях на месте (+=, -=, *=, /=, @=);
+    прямое изменение self.data кэш не сбрасывает - после него нужно вызвать _invalidate().
+    """
+    def _invalidate(self):
+        """Сбрасывает закэшированные разложения"""
+        self.__dict__.pop("_linalg_cache", None)
+
+    def _cached(self, key, compute):
+        """Значение key из кэша разложений, при отсутствии вычисляется через compute()"""
+        cache = self.__dict__.setdefault("_linalg_cache", {})
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    def _square(self):
+        """Данные квадратной матрицы в вещественном (или комплексном) типе с плавающей точкой"""
+        rows, cols = self.data.shape
+        if rows != cols:
+            raise ValueError(f"Разложение возможно только для квадратной матрицы, получена {self.data.shape}")
+        return np.asarray(self.data, dtype=np.result_type(self.data.dtype, np.float64))
+
+    def _factorize(self):
+        """
+        Разложение квадратной матрицы.
+
+        Со scipy хранятся множители: Холецкого для точно симметричной (эрмитовой)
+        положительно определенной матрицы, иначе LU с выбором ведущего элемента.
+        Почти симметричная матрица идет через LU: разложение Холецкого читает только
+        один треугольник и решило бы другую систему.
+
+        В NumPy нет LU-разложения и решения треугольных систем, поэтому без scipy
+        хранится обратная матрица, а solve уточняет по ней решение и проверяет невязку.
+        """
+        data = self._square()
+        if scipy is None:
+            try:
+                inverse = np.linalg.inv(data)
+            except np.linalg.LinAlgError:
+                inverse = None
+            return {"kind": "inverse", "factor": inverse}
+
+        if np.array_equal(data, data.conj().T):
+            try:
+                return {"kind": "cholesky", "factor": scipy.linalg.cho_factor(data)}
+            except np.linalg.LinAlgError:
+                pass
+        with warnings.catch_warnings():
+            # Вырожденность проверяется по диагонали U ниже, предупреждение не нужно
+            warnings.simplefilter("ignore", scipy.linalg.LinAlgWarning)
+            lu, piv = scipy.linalg.lu_factor(data, check_finite=False)
+        if not np.all(np.diag(lu)):
+            return {"kind": "lu", "factor": None}
+        return {"kind": "lu", "factor": (lu, piv)}
+
+    def _factor(self):
+        """Закэшированное разложение, исключение для вырожденной матрицы"""
+        factor = self._cached("factor", self._factorize)
+        if factor["factor"] is None:
+            raise np.linalg.LinAlgError("Матрица вырождена")
+        return factor
+
+    @property
+    def factorization(self):
+        """Что хранится в кэше: множители cholesky или lu (со scipy) либо обратная матрица inverse"""
+        return self._cached("factor", self._factorize)["kind"]
+
+    @staticmethod
+    def _rhs(b, rows):
+        """Правые части как numpy массив: вектор (n,), столбцы (n, k) или пачка (..., n, k)"""
+        rhs = np.asarray(b)
+        size = rhs.shape[0] if rhs.ndim == 1 else rhs.shape[-2] if rhs.ndim > 1 else None
+        if size != rows:
+            raise ValueError(f"Размерность правой части {rhs.shape} не согласована с матрицей из {rows} строк")
+        return rhs
+
+    @staticmethod
+    def _wrap(result, b):
+        """Результат в том же виде, что и правая часть: MatrixNP для MatrixNP, иначе numpy массив"""
+        return MatrixNP(result) if isinstance(b, MatrixNP) else result
+
+    def _solve_factor(self, factor, rhs):
+        """Решение по множителям scipy; пачка (..., n, k) сводится к столбцам (n, ...*k)"""
+        solve = scipy.linalg.cho_solve if factor["kind"] == "cholesky" else scipy.linalg.lu_solve
+        if rhs.ndim <= 2:
+            return solve(factor["factor"], rhs, check_finite=False)
+        columns = np.moveaxis(rhs, -2, 0)
+        result = solve(factor["factor"], columns.reshape(columns.shape[0], -1), check_finite=False)
+        return np.moveaxis(result.reshape(columns.shape), 0, -2)
+
+    def _solve_inverse(self, inverse, rhs):
+        """
+        Решение через обратную матрицу с одним шагом уточнения x += inv @ (b - A x).
+        Если невязка остается больше, чем у обратно устойчивого решения, - np.linalg.solve.
+        """
+        data = self._square()
+        x = inverse @ rhs
+        x = x + inverse @ (rhs - data @ x)
+        residual = np.abs(rhs - data @ x).max(initial=0)
+        eps = np.finfo(x.dtype).eps
+        scale = np.abs(data).sum(axis=1).max() * np.abs(x).max(initial=0) + np.abs(rhs).max(initial=0)
+        if residual > 10 * data.shape[0] * eps * scale:
+            return np.linalg.solve(data, rhs)
+        return x
+
+    def solve(self, b):
+        """
+        Решает A x = b для одной или сразу многих правых частей.
+
+        b - вектор (n,), матрица (n, k) из k правых частей в столбцах или пачка (..., n, k).
+        """
+        factor = self._factor()
+        rhs = self._rhs(b, self.data.shape[0])
+        if factor["kind"] == "inverse":
+            return self._wrap(self._solve_inverse(factor["factor"], rhs), b)
+        return self._wrap(self._solve_factor(factor, rhs), b)
+
+    def inv(self):
+        """Обратная матрица"""
+        factor = self._factor()
+        if factor["kind"] == "inverse":
+            return MatrixNP(factor["factor"].copy())
+        identity = np.eye(self.data.shape[0], dtype=np.result_type(self.data.dtype, np.float64))
+        return MatrixNP(self._solve_factor(factor, identity))
+
+    def det(self):
+        """Определитель матрицы: по множителям разложения, без scipy - через np.linalg.det"""
+        factor = self._cached("factor", self._factorize)
+        if factor["kind"] == "cholesky":
+            triangle, _ = factor["factor"]
+            return np.prod(np.diag(triangle).real) ** 2
+        if factor["kind"] == "lu" and factor["factor"] is not None:
+            lu, piv = factor["factor"]
+            swaps = np.count_nonzero(piv != np.arange(len(piv)))
+            return (-1) ** swaps * np.prod(np.diag(lu))
+        return self._cached("det", lambda: np.linalg.det(self._square()))
+
+    def lstsq(self, b):
+        """
+        Решение задачи наименьших квадратов min ||A x - b|| (для вырожденной или
+        недоопределенной системы - решение с минимальной нормой).
+
+        Псевдообратная матрица вычисляется через SVD один раз и кэшируется, как и в solve.
+        """
+        pinv = self._cached("pinv", lambda: np.linalg.pinv(self.data))
+        return self._wrap(pinv @ self._rhs(b, self.data.shape[0]), b)
+
 
 class IOFileMixin:
     """Примесь для работы с файлами"""
@@ -135,9 +338,21 @@ class PropertyMixin:
     def set_element(self, i, j, value):
         """Установить элемент матрицы по индексам"""
         self.data[i, j] = value
+        self._invalidate()
+
+    def __array__(self, dtype=None, copy=None):
+        """
+        Представление в виде numpy массива, чтобы np.asarray(matrix) работал без копирования.
+        copy=True всегда возвращает копию, copy=False запрещает копирование.
+        """
+        if dtype is None or np.dtype(dtype) == self.data.dtype:
+            return self.data.copy() if copy else self.data
+        if copy is False:
+            raise ValueError(f"Приведение {self.data.dtype} к {np.dtype(dtype)} невозможно без копирования")
+        return self.data.astype(dtype)
 
 
-class MatrixNP(ArithmeticMixin, IOFileMixin, DisplayMixin, PropertyMixin):
+class MatrixNP(ArithmeticMixin, LinalgMixin, IOFileMixin, DisplayMixin, PropertyMixin):
     """Класс матрицы с использованием примесей"""
     def __init__(self, data):
         """
@@ -0,0 +1,216 @@
+import functools
+import sys
+import time
+
+# Классы, чьи операции отмеченные @operation, подменяются на время профилирования
+_INSTRUMENTED = []
+# Активные профилировщики (контексты могут быть вложенными)
+_ACTIVE = []
+# Исходные методы, которые вернутся на место после выхода из последнего контекста
+_ORIGINALS = []
+
+SORT_KEYS = ("time", "flops", "bytes", "count")
+
+
+def _size(shape):
+    """Число элементов матрицы с размерностью shape"""
+    rows, cols = shape
+    return rows * cols
+
+
+def elementwise_flops(matrix, other, result):
+    """Поэлементная операция: одна операция на элемент результата"""
+    return _size(result.shape)
+
+
+def matmul_flops(matrix, other, result):
+    """Матричное умножение (m, k) @ (k, n): m * n * k умножений и столько же сложений"""
+    rows, inner = matrix.shape
+    return 2 * rows * inner * other.shape[1]
+
+
+def power_flops(matrix, power, result):
+    """Возведение в степень power последовательными умножениями: power - 1 матричных умножений"""
+    rows = matrix.shape[0]
+    return max(power - 1, 0) * 2 * rows ** 3
+
+
+def operation(name, flops=None):
+    """
+    Отмечает метод как операцию для профилирования.
+
+    Метод не оборачивается и остается прежним, поэтому без активного профилировщика
+    накладных расходов нет. flops(matrix, other, result) оценивает число операций
+    с плавающей точкой, None - операция без вычислений (например, транспонирование).
+    """
+    def decorator(func):
+        func._operation = (name, flops)
+        return func
+    return decorator
+
+
+def instrumented(cls):
+    """Регистрирует класс, методы которого отмечены @operation"""
+    _INSTRUMENTED.append(cls)
+    return cls
+
+
+def _shape(value):
+    """Размерность матрицы или имя типа для скаляра"""
+    shape = getattr(value, "shape", None)
+    return tuple(shape) if shape is not None else type(value).__name__
+
+
+def _result_bytes(result):
+    """
+    Оценка памяти, выделенной под результат: для numpy - размер буфера
+    (0 для представлений вроде транспонирования), для списков - размер самих списков
+    без объектов-чисел.
+    """
+    data = getattr(result, "data", None)
+    if data is None:
+        return 0
+    if hasattr(data, "nbytes"):
+        return 0 if data.base is not None else data.nbytes
+    return sys.getsizeof(data) + sum(sys.getsizeof(row) for row in data)
+
+
+def _traced(func, name, flops):
+    """Обертка метода, которая замеряет время и передает замер активным профилировщикам"""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter_ns()
+        result = func(self, *args, **kwargs)
+        elapsed = time.perf_counter_ns() - start
+        if result is NotImplemented:
+            return result
+
+        other = args[0] if args else None
+        key = (name, type(self).__name__, _shape(self), _shape(other) if args else None)
+        count = flops(self, other, result) if flops is not None else 0
+        nbytes = _result_bytes(result)
+        for profiler in _ACTIVE:
+            profiler.record(key, count, nbytes, elapsed)
+        return result
+    return wrapper
+
+
+def _enable():
+    """Подменяет отмеченные методы зарегистрированных классов обертками"""
+    for cls in _INSTRUMENTED:
+        for attr, func in list(vars(cls).items()):
+            if hasattr(func, "_operation"):
+                _ORIGINALS.append((cls, attr, func))
+                setattr(cls, attr, _traced(func, *func._operation))
+
+
+def _disable():
+    """Возвращает исходные методы"""
+    while _ORIGINALS:
+        cls, attr, func = _ORIGINALS.pop()
+        setattr(cls, attr, func)
+
+
+class OperationProfiler:
+    """
+    Профилировщик матричных операций.
+
+    Внутри контекста with OperationProfiler() as profiler: для каждой операции
+    (имя, класс, размерности операндов) собирается число вызовов, оценка FLOP,
+    выделенная под результаты память и суммарное время. Методы подменяются только
+    на время контекста, вне его операции работают без изменений.
+    """
+    def __init__(self):
+        self.stats = {}
+
+    def record(self, key, flops, nbytes, elapsed_ns):
+        """Добавляет замер одного вызова операции"""
+        entry = self.stats.get(key)
+        if entry is None:
+            entry = self.stats[key] = {"count": 0, "flops": 0, "bytes": 0, "time": 0}
+        entry["count"] += 1
+        entry["flops"] += flops
+        entry["bytes"] += nbytes
+        entry["time"] += elapsed_ns
+
+    def __enter__(self):
+        if not _ACTIVE:
+            _enable()
+        _ACTIVE.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _ACTIVE.remove(self)
+        if not _ACTIVE:
+            _disable()
+        return False
+
+    def totals(self):
+        """Суммарные показатели по всем операциям"""
+        totals = {"count": 0, "flops": 0, "bytes": 0, "time": 0}
+        for entry in self.stats.values():
+            for field in totals:
+                totals[field] += entry[field]
+        return totals
+
+    def report(self, sort="time", limit=None):
+        """Таблица операций, отсортированная по убыванию sort (time, flops, bytes или count)"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Неизвестный ключ сортировки: {sort}, допустимы {', '.join(SORT_KEYS)}")
+
+        items = sorted(self.stats.items(), key=lambda item: item[1][sort], reverse=True)
+        if limit is not None:
+            items = items[:limit]
+
+        lines = [
+            "| Операция | Класс | Размерности | Вызовы | Время (мс) | MFLOP | GFLOP/s | Память (МБ) |",
+            "|----------|-------|-------------|--------|------------|-------|---------|-------------|",
+        ]
+        for (name, cls, shape, other), entry in items:
+            shapes = f"{shape} {other}" if other is not None else f"{shape}"
+            seconds = entry["time"] / 1e9
+            rate = entry["flops"] / seconds / 1e9 if seconds else 0
+            lines.append(
+                f"| {name} | {cls} | {shapes} | {entry['count']} | {entry['time'] / 1e6:.3f} "
+                f"| {entry['flops'] / 1e6:.3f} | {rate:.2f} | {entry['bytes'] / 2 ** 20:.3f} |"
+            )
+
+        totals = self.totals()
+        lines.append("")
+        lines.append(
+            f"Всего: {totals['count']} вызовов, {totals['time'] / 1e6:.3f} мс, "
+            f"{totals['flops'] / 1e6:.3f} MFLOP, {totals['bytes'] / 2 ** 20:.3f} МБ"
+        )
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import numpy as np
+
+    from matrix import Matrix
+    from matrix_np import MatrixNP
+    # Классы регистрируются в импортированном модуле profiler, а не в __main__
+    from profiler import OperationProfiler
+
+    np.random.seed(0)
+
+    a = MatrixNP(np.random.rand(200, 200))
+    b = MatrixNP(np.random.rand(200, 200))
+    small_a = Matrix(np.random.randint(0, 10, (30, 30)))
+    small_b = Matrix(np.random.randint(0, 10, (30, 30)))
+
+    with OperationProfiler() as profiler:
+        for _ in range(10):
+            c = a @ b
+            c = c + a
+            c = c * 2
+            c = c.transpose()
+        d = a ** 5
+        e = small_a + small_b
+        f = small_a.__matmul__(small_b, use_cache=False)
+
+    report = profiler.report()
+    print(report)
+
+    with open("artifacts/profile_report.txt", "w") as file:
+        file.write(report + "\n")
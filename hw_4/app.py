@@ -1,199 +1,1345 @@
+import argparse
+import asyncio
 import codecs
-import datetime
+import collections
+import http.server
+import json
+import logging
+import logging.handlers
 import multiprocessing
+import multiprocessing.connection
+import multiprocessing.queues
+import queue
+import signal
+import struct
+import sys
 import threading
 import time
+from multiprocessing import shared_memory
 
+# Максимальное время блокирующего ожидания сообщения, после которого
+# стадия заново проверяет exit_event. На задержку доставки не влияет:
+# ожидание прерывается сразу, как только сообщение пришло.
+WAIT_TIMEOUT = 0.5
 
-def process_a(input_queue, pipe_conn, exit_event):
+# По умолчанию процесс A отправляет не чаще 1 сообщения в 5 секунд
+DEFAULT_RATE = 0.2
+DEFAULT_BURST = 1
+
+# Окно, за которое набирается пачка сообщений между стадиями
+DEFAULT_BATCH_WINDOW = 0.01
+
+# Размер области данных кольцевого буфера в разделяемой памяти, байт
+DEFAULT_RING_CAPACITY = 1 << 20
+
+# Емкость очередей между стадиями
+DEFAULT_QUEUE_SIZE = 100
+
+# Политики переполнения очередей: ждать места, выбросить самое старое
+# сообщение или выбросить новое
+QUEUE_POLICIES = ("block", "drop-oldest", "drop-newest")
+
+# Сколько секунд при завершении дается стадиям на обработку сообщений в пути
+DEFAULT_DRAIN_TIMEOUT = 5.0
+
+# Период экспорта метрик, секунд
+DEFAULT_METRICS_INTERVAL = 1.0
+
+# Индексы счетчиков стадии: принято, отправлено, отброшено
+IN, OUT, DROPPED = range(3)
+
+LOG_FORMAT = "[%(asctime)s.%(msecs)03d] %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+logger = logging.getLogger("app")
+
+TRANSPORTS = ("auto", "pipe", "queue", "shm")
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты по алгоритму token bucket.
+
+    Токены накапливаются со скоростью rate в секунду, но не больше burst.
+    Каждая отправка расходует один токен.
+    """
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        if rate <= 0:
+            raise ValueError("Частота должна быть положительной")
+        if burst < 1:
+            raise ValueError("Размер пачки должен быть не меньше 1")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self):
+        """Забирает токен, если он есть. Возвращает True при успехе."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def delay(self):
+        """Время в секундах до появления следующего токена."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class MicroBatcher:
+    """
+    Накопитель пачек сообщений.
+
+    Пачка отдается, когда в ней набралось batch_size сообщений или когда
+    с момента появления в ней первого сообщения прошло batch_window секунд.
+    """
+    def __init__(self, batch_size=1, batch_window=DEFAULT_BATCH_WINDOW):
+        if batch_size < 1:
+            raise ValueError("Размер пачки должен быть не меньше 1")
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.items = []
+        self.started_at = None
+
+    def add(self, item):
+        """Добавляет сообщение. Возвращает пачку, если она заполнилась, иначе None."""
+        if not self.items:
+            self.started_at = time.monotonic()
+        self.items.append(item)
+        if len(self.items) >= self.batch_size:
+            return self.flush()
+        return None
+
+    def timeout(self):
+        """Сколько секунд осталось до принудительной отправки текущей пачки."""
+        if not self.items:
+            return WAIT_TIMEOUT
+        return max(0.0, self.started_at + self.batch_window - time.monotonic())
+
+    def flush_if_due(self):
+        """Возвращает пачку, если ее окно истекло, иначе None."""
+        if self.items and self.timeout() == 0.0:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Возвращает накопленную пачку (возможно, пустую) и начинает новую."""
+        items, self.items = self.items, []
+        return items
+
+
+class PipeChannel:
+    """
+    Адаптер конца multiprocessing.Pipe к интерфейсу очереди (put/get с таймаутом),
+    чтобы стадии конвейера работали одинаково с Pipe и с Queue.
+    """
+    def __init__(self, conn):
+        self.conn = conn
+
+    def put(self, message):
+        self.conn.send(message)
+
+    def get(self, timeout=None):
+        if not multiprocessing.connection.wait([self.conn], timeout=timeout):
+            raise queue.Empty
+        return self.conn.recv()
+
+
+class RecordTooLargeError(ValueError):
+    """Записи пачки не помещаются в кольцевой буфер; rejected - их номера seq."""
+    def __init__(self, rejected, capacity):
+        super().__init__(
+            f"Сообщений не помещается в кольцевой буфер ({capacity} байт): {len(rejected)}"
+        )
+        self.rejected = rejected
+
+
+class SharedMemoryChannel:
+    """
+    Канал на кольцевом буфере в multiprocessing.shared_memory для одного писателя
+    и одного читателя. Интерфейс тот же, что у очереди (put/get с таймаутом).
+
+    Пачка (seq, text, stamp) записывается как последовательность записей
+    "seq (8 байт), stamp (8 байт), длина (4 байта), текст в UTF-8" без pickle. В заголовке буфера
+    хранятся два монотонно растущих счетчика байт: позиция записи и позиция
+    чтения. Каждый из них меняет только одна сторона, поэтому для обмена данными
+    блокировки не нужны; семафор служит лишь для пробуждения ждущего читателя.
+    """
+    _HEADER = struct.Struct("QQ")
+    _RECORD = struct.Struct("qqI")
+    _EXIT_LENGTH = 0xFFFFFFFF
+
+    def __init__(self, capacity=DEFAULT_RING_CAPACITY):
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(create=True, size=self._HEADER.size + capacity)
+        self._HEADER.pack_into(self.shm.buf, 0, 0, 0)
+        self.name = self.shm.name
+        self.notify = multiprocessing.Semaphore(0)
+        self._owner = True
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["shm"]
+        state["_owner"] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.shm = shared_memory.SharedMemory(name=self.name)
+
+    def _positions(self):
+        return self._HEADER.unpack_from(self.shm.buf, 0)
+
+    def _copy_in(self, position, data):
+        offset = position % self.capacity
+        first = min(len(data), self.capacity - offset)
+        start = self._HEADER.size
+        self.shm.buf[start + offset:start + offset + first] = data[:first]
+        if first < len(data):
+            self.shm.buf[start:start + len(data) - first] = data[first:]
+
+    def _copy_out(self, position, size):
+        offset = position % self.capacity
+        first = min(size, self.capacity - offset)
+        start = self._HEADER.size
+        data = bytes(self.shm.buf[start + offset:start + offset + first])
+        if first < size:
+            data += bytes(self.shm.buf[start:start + size - first])
+        return data
+
+    def _publish_head(self, head):
+        struct.pack_into("Q", self.shm.buf, 0, head)
+
+    def put(self, batch):
+        """
+        Записывает пачку (или команду "EXIT"), ожидая места в буфере при переполнении.
+
+        Записи длиннее буфера не записываются: остальная пачка отправляется,
+        после чего выбрасывается RecordTooLargeError с номерами отброшенных записей.
+        """
+        rejected = []
+        if batch == "EXIT":
+            records = [self._RECORD.pack(0, 0, self._EXIT_LENGTH)]
+        else:
+            records = []
+            for seq, text, stamp in batch:
+                encoded = text.encode("utf-8")
+                if self._RECORD.size + len(encoded) > self.capacity:
+                    rejected.append(seq)
+                    continue
+                records.append(self._RECORD.pack(seq, stamp, len(encoded)) + encoded)
+
+        head, _ = self._positions()
+        published = head
+        for record in records:
+            delay = 0.0
+            while head + len(record) - self._positions()[1] > self.capacity:
+                # Читатель должен увидеть уже записанную часть пачки, иначе оба будут ждать друг друга
+                if head != published:
+                    self._publish_head(head)
+                    self.notify.release()
+                    published = head
+                time.sleep(delay)
+                delay = min(delay * 2 or 1e-5, 1e-3)
+            self._copy_in(head, record)
+            head += len(record)
+        if head != published:
+            self._publish_head(head)
+            self.notify.release()
+
+        if rejected:
+            raise RecordTooLargeError(rejected, self.capacity)
+
+    def get(self, timeout=None):
+        """
+        Возвращает все доступные записи одной пачкой либо "EXIT".
+        Если данных нет дольше timeout секунд, выбрасывает queue.Empty.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            head, tail = self._positions()
+            if head != tail:
+                break
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not self.notify.acquire(timeout=remaining):
+                raise queue.Empty
+
+        batch = []
+        while tail != head:
+            seq, stamp, length = self._RECORD.unpack(self._copy_out(tail, self._RECORD.size))
+            if length == self._EXIT_LENGTH:
+                if batch:
+                    break
+                tail += self._RECORD.size
+                struct.pack_into("Q", self.shm.buf, 8, tail)
+                return "EXIT"
+            text = self._copy_out(tail + self._RECORD.size, length).decode("utf-8")
+            batch.append((seq, text, stamp))
+            tail += self._RECORD.size + length
+        struct.pack_into("Q", self.shm.buf, 8, tail)
+        return batch
+
+    def qsize(self):
+        """Число байт, записанных в буфер, но еще не прочитанных; None для закрытого канала."""
+        if self.shm.buf is None:
+            return None
+        head, tail = self._positions()
+        return head - tail
+
+    def close(self):
+        """Отключается от разделяемой памяти; создатель канала также освобождает ее."""
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def make_output_channel(transport="auto", maxsize=DEFAULT_QUEUE_SIZE):
+    """
+    Создает выходной канал от процессов B к читателю для заданного транспорта.
+    Очередь ограничена maxsize пачками, кольцевой буфер - своим размером.
+    """
+    if transport == "shm":
+        return SharedMemoryChannel()
+    return multiprocessing.Queue(maxsize)
+
+
+def put_with_policy(target, item, policy="block", counters=None, size=1):
+    """
+    Кладет item в очередь target с учетом политики переполнения:
+    "block" ждет свободного места, "drop-newest" отбрасывает item,
+    "drop-oldest" вынимает из очереди самый старый элемент и повторяет попытку.
+    Отброшенные элементы (size сообщений на элемент) учитываются в counters[DROPPED].
+    Каналы, отличные от multiprocessing.Queue, поддерживают только "block".
+
+    Возвращает:
+        bool: True, если item помещен в очередь.
+    """
+    if policy == "block" or not isinstance(target, multiprocessing.queues.Queue):
+        target.put(item)
+        return True
+
+    while True:
+        try:
+            target.put(item, block=False)
+            return True
+        except queue.Full:
+            pass
+
+        if policy == "drop-newest":
+            dropped = item
+        else:
+            try:
+                dropped = target.get_nowait()
+            except queue.Empty:
+                continue
+        if counters is not None:
+            counters[DROPPED] += len(dropped) if isinstance(dropped, list) else size
+        if dropped is item:
+            return False
+
+
+def _put_control(channel, message, timeout):
+    """Отправляет служебное сообщение, ожидая места не дольше timeout секунд."""
+    if isinstance(channel, multiprocessing.queues.Queue):
+        try:
+            channel.put(message, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+    channel.put(message)
+    return True
+
+
+def close_channel(channel):
+    """Освобождает ресурсы канала, если они есть."""
+    if isinstance(channel, SharedMemoryChannel):
+        channel.close()
+
+
+class LatencyHistogram:
+    """
+    Гистограмма сквозных задержек сообщений.
+    Корзина i содержит задержки до 2**i микросекунд включительно.
+    """
+    BUCKETS = 32
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total_ns = 0
+
+    def observe(self, latency_ns):
+        """Учитывает одну задержку в наносекундах."""
+        micros = max(0, latency_ns) // 1000
+        index = min((micros - 1).bit_length() if micros > 1 else 0, self.BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ns += latency_ns
+
+    def quantile(self, q):
+        """Верхняя граница корзины, в которую попадает квантиль q, в микросекундах."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return 2 ** index
+        return 2 ** (self.BUCKETS - 1)
+
+    def snapshot(self):
+        """Словарь со сводкой по задержкам для экспорта в JSON."""
+        return {
+            "count": self.count,
+            "mean_us": self.total_ns / self.count / 1000 if self.count else None,
+            "p50_us": self.quantile(0.5),
+            "p95_us": self.quantile(0.95),
+            "p99_us": self.quantile(0.99),
+            "buckets_us": {
+                str(2 ** index): bucket_count
+                for index, bucket_count in enumerate(self.counts) if bucket_count
+            },
+        }
+
+
+class PipelineMetrics:
+    """
+    Метрики конвейера: счетчики стадий, размеры очередей и гистограмма задержек.
+
+    Счетчики каждого процесса стадии (принято, отправлено, отброшено) лежат в
+    отдельном массиве в разделяемой памяти, у которого один писатель, поэтому
+    блокировки не нужны. Гистограмму задержек ведет читатель выходной очереди.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.gauges = {}
+        self.latency = LatencyHistogram()
+
+    def add_stage(self, stage):
+        """Создает и регистрирует счетчики очередного процесса стадии stage."""
+        counters = multiprocessing.Array("q", 3, lock=False)
+        self.stages.setdefault(stage, []).append(counters)
+        return counters
+
+    def add_gauge(self, name, read):
+        """Регистрирует показатель name, значение которого возвращает функция read."""
+        self.gauges[name] = read
+
+    def snapshot(self):
+        """Текущие значения всех метрик в виде словаря."""
+        stages = {
+            stage: {
+                "in": sum(counters[IN] for counters in workers),
+                "out": sum(counters[OUT] for counters in workers),
+                "dropped": sum(counters[DROPPED] for counters in workers),
+            }
+            for stage, workers in self.stages.items()
+        }
+        return {
+            "time": time.time(),
+            "stages": stages,
+            "queues": {name: read() for name, read in self.gauges.items()},
+            "latency": self.latency.snapshot(),
+        }
+
+
+def queue_depth(channel):
+    """
+    Текущая заполненность канала: число элементов очереди, число байт в кольцевом
+    буфере или None, если ее нельзя узнать (Pipe, qsize на macOS, закрытый канал).
+    """
+    try:
+        return channel.qsize()
+    except (AttributeError, NotImplementedError, OSError, ValueError):
+        return None
+
+
+def metrics_exporter(metrics, stop_event, path, interval=DEFAULT_METRICS_INTERVAL):
+    """
+    Поток экспорта метрик: раз в interval секунд дописывает снимок метрик
+    строкой JSON в файл path, последний снимок - при остановке.
+    """
+    with open(path, "a", encoding="utf-8") as f:
+        while True:
+            stopped = stop_event.wait(interval)
+            f.write(json.dumps(metrics.snapshot(), ensure_ascii=False) + "\n")
+            f.flush()
+            if stopped:
+                break
+
+
+def start_metrics_server(metrics, port):
+    """
+    Запускает HTTP-сервер на 127.0.0.1:port, отдающий текущий снимок метрик в JSON
+    на любой GET-запрос. Сервер работает в фоновом потоке; возвращает его объект.
+    """
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_metrics_export(metrics, metrics_file=None, metrics_port=None,
+                         interval=DEFAULT_METRICS_INTERVAL):
+    """
+    Включает выбранные способы экспорта метрик.
+    Возвращает функцию, которая останавливает экспорт и записывает последний снимок.
+    """
+    stop_event = threading.Event()
+    exporter = None
+    server = None
+    if metrics_file:
+        exporter = threading.Thread(
+            target=metrics_exporter, args=(metrics, stop_event, metrics_file, interval)
+        )
+        exporter.start()
+    if metrics_port:
+        server = start_metrics_server(metrics, metrics_port)
+        logger.info("Метрики доступны по адресу http://127.0.0.1:%d/", metrics_port)
+
+    def stop():
+        stop_event.set()
+        if exporter is not None:
+            exporter.join()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    return stop
+
+
+def attach_queue_handler(log_queue, level=logging.INFO):
+    """Направляет все записи журнала текущего процесса в очередь log_queue."""
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+
+
+def setup_logging(log_queue, level=logging.INFO):
+    """
+    Настраивает неблокирующий журнал: стадии только кладут записи в log_queue,
+    а в stdout их выводит отдельный поток QueueListener.
+    Возвращает запущенный listener, который нужно остановить при завершении.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    attach_queue_handler(log_queue, level)
+    listener.start()
+    return listener
+
+
+def process_a(input_queue, ab_channel, exit_event, rate=DEFAULT_RATE, burst=DEFAULT_BURST,
+              backlog_size=None, batch_size=1, batch_window=DEFAULT_BATCH_WINDOW,
+              name="A", counters=None, log_queue=None, max_backlog=DEFAULT_QUEUE_SIZE,
+              policy="block"):
     """
     Процесс A.
-    Получает сообщения из input_queue, применяет .lower() и отправляет в процесс B.
-    Отправляет сообщение не чаще, чем 1 раз в 5 секунд.
+    Получает сообщения (seq, text, stamp) из input_queue, применяет .lower() и
+    отправляет пачками в ab_channel для процесса B.
+    Частота отправки ограничена token bucket с параметрами rate и burst
+    (по умолчанию не чаще, чем 1 раз в 5 секунд; rate=None снимает ограничение).
+    Пока лимит исчерпан, процесс продолжает читать input_queue и копит сообщения
+    в очереди ожидания, размер которой публикуется в backlog_size
+    (multiprocessing.Value), если он передан. Очередь ожидания ограничена
+    max_backlog сообщениями: при политике "block" процесс перестает читать
+    input_queue, при "drop-oldest"/"drop-newest" отбрасывает старое или новое сообщение.
+    После команды выхода процесс досылает очередь ожидания и завершается;
+    если раньше выставлен exit_event, оставшиеся сообщения отбрасываются.
     """
-    print(f"[{datetime.datetime.now()}] Процесс A запущен")
-    
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if log_queue is not None:
+        attach_queue_handler(log_queue)
+    counters = counters if counters is not None else [0, 0, 0]
+    logger.info("Процесс %s запущен", name)
+
+    bucket = TokenBucket(rate, burst) if rate else None
+    backlog = collections.deque()
+    batcher = MicroBatcher(batch_size, batch_window)
+
+    def send(batch):
+        try:
+            ab_channel.put(batch)
+        except RecordTooLargeError as e:
+            counters[OUT] += len(batch) - len(e.rejected)
+            counters[DROPPED] += len(e.rejected)
+            logger.error("Процесс %s: %s", name, e)
+        else:
+            counters[OUT] += len(batch)
+
+    draining = False
+
     while not exit_event.is_set():
+        timeout = batcher.timeout()
+        if backlog and bucket is not None:
+            timeout = min(timeout, bucket.delay())
+        message = None
+        if draining or (policy == "block" and len(backlog) >= max_backlog):
+            time.sleep(timeout)
+        else:
+            try:
+                message = input_queue.get(timeout=timeout)
+            except queue.Empty:
+                pass
+
         try:
-            if not input_queue.empty():
-                message = input_queue.get()
-                
-                if message == "EXIT":
-                    print(f"[{datetime.datetime.now()}] Процесс A: получена команда выхода")
-                    pipe_conn.send("EXIT")
-                    break
-                
-                
-                processed_message = message.lower()
-                time_now = datetime.datetime.now()
-                print(f"[{time_now}] Процесс A: получено '{message}', обработано -> '{processed_message}'")
-                
-                
-                pipe_conn.send(processed_message)
-                
-                
-                time.sleep(5)
-            else:
-                
-                time.sleep(0.1)
+            if message == "EXIT":
+                logger.info("Процесс %s: получена команда выхода", name)
+                draining = True
+                message = None
+
+            if message is not None:
+                counters[IN] += 1
+                seq, text, stamp = message
+                processed_message = text.lower()
+                logger.info("Процесс %s: получено '%s', обработано -> '%s'", name, text, processed_message)
+                if len(backlog) < max_backlog:
+                    backlog.append((seq, processed_message, stamp))
+                elif policy == "drop-oldest":
+                    backlog.popleft()
+                    backlog.append((seq, processed_message, stamp))
+                    counters[DROPPED] += 1
+                else:
+                    counters[DROPPED] += 1
+
+            while backlog and (bucket is None or bucket.try_acquire()):
+                batch = batcher.add(backlog.popleft())
+                if batch:
+                    send(batch)
+
+            batch = batcher.flush_if_due()
+            if batch:
+                send(batch)
+
+            if draining and not backlog:
+                batch = batcher.flush()
+                if batch:
+                    send(batch)
+                break
         except Exception as e:
-            print(f"[{datetime.datetime.now()}] Процесс A: ошибка - {e}")
+            logger.error("Процесс %s: ошибка - %s", name, e)
+        finally:
+            if backlog_size is not None:
+                backlog_size.value = len(backlog)
+
+    dropped = len(backlog) + len(batcher.items)
+    if dropped:
+        counters[DROPPED] += dropped
+        logger.info("Процесс %s: не отправлено сообщений: %d", name, dropped)
     
-    print(f"[{datetime.datetime.now()}] Процесс A завершен")
+    logger.info("Процесс %s завершен", name)
 
 
-def process_b(pipe_conn, output_queue, exit_event):
+def process_b(ab_channel, output_queue, exit_event, batch_size=1,
+              batch_window=DEFAULT_BATCH_WINDOW, name="B", counters=None, log_queue=None,
+              policy="block"):
     """
     Процесс B.
-    Получает сообщения из pipe_conn, применяет rot13 и отправляет в output_queue.
+    Получает пачки сообщений из ab_channel, применяет rot13 и отправляет
+    пачками в output_queue с политикой переполнения policy.
     """
-    print(f"[{datetime.datetime.now()}] Процесс B запущен")
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if log_queue is not None:
+        attach_queue_handler(log_queue)
+    counters = counters if counters is not None else [0, 0, 0]
+    logger.info("Процесс %s запущен", name)
+
+    batcher = MicroBatcher(batch_size, batch_window)
+
+    def send(batch):
+        if put_with_policy(output_queue, batch, policy, counters):
+            counters[OUT] += len(batch)
     
     while not exit_event.is_set():
         try:
-            if pipe_conn.poll():  
-                message = pipe_conn.recv()
-                
-                if message == "EXIT":
-                    print(f"[{datetime.datetime.now()}] Процесс B: получена команда выхода")
-                    output_queue.put("EXIT")
-                    break
-                
-                
+            batch = ab_channel.get(timeout=batcher.timeout())
+        except queue.Empty:
+            batch = None
+        except EOFError:
+            logger.info("Процесс %s: канал закрыт", name)
+            break
+
+        try:
+            if batch == "EXIT":
+                batch = batcher.flush()
+                if batch:
+                    send(batch)
+                logger.info("Процесс %s: получена команда выхода", name)
+                break
+
+            for seq, message, stamp in batch or ():
+                counters[IN] += 1
                 encoded_message = codecs.encode(message, 'rot_13')
-                time_now = datetime.datetime.now()
-                print(f"[{time_now}] Процесс B: получено '{message}', закодировано -> '{encoded_message}'")
-                
-                
-                output_queue.put(encoded_message)
-            else:
-                
-                time.sleep(0.1)
+                logger.info("Процесс %s: получено '%s', закодировано -> '%s'", name, message, encoded_message)
+                ready = batcher.add((seq, encoded_message, stamp))
+                if ready:
+                    send(ready)
+
+            ready = batcher.flush_if_due()
+            if ready:
+                send(ready)
         except Exception as e:
-            print(f"[{datetime.datetime.now()}] Процесс B: ошибка - {e}")
+            logger.error("Процесс %s: ошибка - %s", name, e)
+
+    if batcher.items:
+        counters[DROPPED] += len(batcher.items)
+        logger.info("Процесс %s: не отправлено сообщений: %d", name, len(batcher.items))
     
-    print(f"[{datetime.datetime.now()}] Процесс B завершен")
+    logger.info("Процесс %s завершен", name)
 
 
-def input_reader(input_queue, exit_event):
+def input_reader(input_queue, exit_event, workers=1, counters=None, policy="block"):
     """
     Поток для чтения ввода пользователя.
+    Каждой строке присваивается порядковый номер и отметка времени
+    time.monotonic_ns() для измерения сквозной задержки. Если input_queue
+    заполнена, действует политика переполнения policy. По команде 'exit' или
+    концу ввода в очередь отправляется по одной команде выхода на каждый процесс A.
     """
-    print(f"[{datetime.datetime.now()}] Начало чтения пользовательского ввода. Введите 'exit' для завершения.")
-    
+    counters = counters if counters is not None else [0, 0, 0]
+    logger.info("Начало чтения пользовательского ввода. Введите 'exit' для завершения.")
+
+    seq = 0
     while not exit_event.is_set():
         try:
             
             message = input()
-            time_now = datetime.datetime.now()
             
             if message.lower() == 'exit':
-                print(f"[{time_now}] Получена команда выхода")
-                input_queue.put("EXIT")
-                exit_event.set()
+                logger.info("Получена команда выхода")
                 break
             
-            print(f"[{time_now}] Отправлено в процесс A: '{message}'")
-            input_queue.put(message)
+            counters[IN] += 1
+            if put_with_policy(input_queue, (seq, message, time.monotonic_ns()), policy, counters):
+                counters[OUT] += 1
+                logger.info("Отправлено в процесс A: '%s'", message)
+            seq += 1
         except EOFError:
             
             break
         except Exception as e:
-            print(f"[{datetime.datetime.now()}] Ошибка при чтении ввода: {e}")
+            logger.error("Ошибка при чтении ввода: %s", e)
+
+    for _ in range(workers):
+        input_queue.put("EXIT")
     
-    print(f"[{datetime.datetime.now()}] Чтение пользовательского ввода завершено")
+    logger.info("Чтение пользовательского ввода завершено")
 
 
-def output_reader(output_queue, exit_event):
+def output_reader(output_queue, exit_event, ordered=False, metrics=None,
+                  reorder_window=DEFAULT_QUEUE_SIZE):
     """
     Поток для чтения из выходной очереди.
+    При ordered=True сообщения выводятся в порядке их поступления на вход
+    (по порядковому номеру), даже если несколько процессов B обработали их
+    в другом порядке. Если отложенных сообщений больше reorder_window,
+    недостающие номера считаются отброшенными и пропускаются. При выходе
+    оставшиеся отложенные сообщения выводятся по порядку номеров, а не теряются.
+    Сквозная задержка каждого сообщения учитывается в metrics.latency,
+    если metrics передан.
     """
-    print(f"[{datetime.datetime.now()}] Начало чтения выходной очереди")
+    counters = metrics.add_stage("output") if metrics is not None else [0, 0, 0]
+    logger.info("Начало чтения выходной очереди")
+
+    pending = {}
+    next_seq = 0
+    skipped = 0
     
     while not exit_event.is_set():
         try:
-            
-            if not output_queue.empty():
-                message = output_queue.get()
-                
-                if message == "EXIT":
-                    print(f"[{datetime.datetime.now()}] Получена команда выхода из процесса B")
-                    break
-                
-                time_now = datetime.datetime.now()
-                print(f"[{time_now}] Получено от процесса B: '{message}'")
-            else:
-                
-                time.sleep(0.1)
+            batch = output_queue.get(timeout=WAIT_TIMEOUT)
+        except queue.Empty:
+            continue
+
+        try:
+            if batch == "EXIT":
+                logger.info("Получена команда выхода из процесса B")
+                break
+
+            now = time.monotonic_ns()
+            counters[IN] += len(batch)
+            if metrics is not None:
+                for _, _, stamp in batch:
+                    metrics.latency.observe(now - stamp)
+
+            if not ordered:
+                for _, message, _ in batch:
+                    logger.info("Получено от процесса B: '%s'", message)
+                counters[OUT] += len(batch)
+                continue
+
+            pending.update((seq, message) for seq, message, _ in batch)
+            if len(pending) > reorder_window:
+                skipped += min(pending) - next_seq
+                next_seq = min(pending)
+            while next_seq in pending:
+                message = pending.pop(next_seq)
+                logger.info("Получено от процесса B: '%s'", message)
+                counters[OUT] += 1
+                next_seq += 1
         except Exception as e:
-            print(f"[{datetime.datetime.now()}] Ошибка при чтении из выходной очереди: {e}")
+            logger.error("Ошибка при чтении из выходной очереди: %s", e)
+
+    for seq in sorted(pending):
+        skipped += seq - next_seq
+        logger.info("Получено от процесса B: '%s'", pending[seq])
+        counters[OUT] += 1
+        next_seq = seq + 1
+    if skipped:
+        # Пропущенные номера уже учтены как отброшенные стадиями, которые их отбросили
+        logger.info("Пропущено номеров при упорядочивании: %d", skipped)
     
-    print(f"[{datetime.datetime.now()}] Чтение выходной очереди завершено")
+    logger.info("Чтение выходной очереди завершено")
+
+
+def start_stages(input_queue, output_queue, exit_event, *, workers_a=1, workers_b=1,
+                 rate=DEFAULT_RATE, burst=DEFAULT_BURST, batch_size=1,
+                 batch_window=DEFAULT_BATCH_WINDOW, transport="auto", metrics=None,
+                 log_queue=None, queue_size=DEFAULT_QUEUE_SIZE, policy="block"):
+    """
+    Создает процессы стадий A и B и канал между ними.
+    При transport="auto" A и B связаны через Pipe, если в каждой стадии по одному
+    процессу, иначе через общую multiprocessing.Queue. Транспорт "shm"
+    (кольцевой буфер в разделяемой памяти) допускает только по одному процессу
+    в стадии.
+    Ограничение частоты rate делится между процессами A поровну.
+    Очередь между A и B ограничена queue_size пачками, очереди ожидания A -
+    queue_size сообщениями; при переполнении действует политика policy.
+    Счетчики процессов и размеры очередей регистрируются в metrics.
+
+    Возвращает:
+        tuple: (процессы A, процессы B, канал A -> B, счетчики очереди ожидания A).
+    """
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Неизвестный транспорт: {transport}")
+    single = workers_a == 1 and workers_b == 1
+    if transport in ("pipe", "shm") and not single:
+        raise ValueError(f"Транспорт {transport} поддерживает только по одному процессу в стадии")
+
+    if transport == "shm":
+        a_channel = b_channel = SharedMemoryChannel()
+    elif transport == "pipe" or (transport == "auto" and single):
+        a_conn, b_conn = multiprocessing.Pipe()
+        a_channel, b_channel = PipeChannel(a_conn), PipeChannel(b_conn)
+    else:
+        a_channel = b_channel = multiprocessing.Queue(queue_size)
+
+    metrics = metrics if metrics is not None else PipelineMetrics()
+    worker_rate = rate / workers_a if rate else None
+    worker_burst = max(1, burst // workers_a)
+    backlog_sizes = [multiprocessing.Value("i", 0) for _ in range(workers_a)]
+
+    metrics.add_gauge("input", lambda: queue_depth(input_queue))
+    metrics.add_gauge("backlog_a", lambda: sum(size.value for size in backlog_sizes))
+    metrics.add_gauge("ab_channel", lambda: queue_depth(a_channel))
+    metrics.add_gauge("output", lambda: queue_depth(output_queue))
+
+    a_processes = [
+        multiprocessing.Process(
+            target=process_a,
+            args=(input_queue, a_channel, exit_event, worker_rate, worker_burst,
+                  backlog_sizes[i], batch_size, batch_window,
+                  "A" if workers_a == 1 else f"A{i + 1}", metrics.add_stage("A"), log_queue,
+                  queue_size, policy)
+        )
+        for i in range(workers_a)
+    ]
+    b_processes = [
+        multiprocessing.Process(
+            target=process_b,
+            args=(b_channel, output_queue, exit_event, batch_size, batch_window,
+                  "B" if workers_b == 1 else f"B{i + 1}", metrics.add_stage("B"), log_queue,
+                  policy)
+        )
+        for i in range(workers_b)
+    ]
+    return a_processes, b_processes, a_channel, backlog_sizes
 
 
-def main():
+def stop_stages(a_processes, b_processes, ab_channel, output_queue, exit_event, timeout=None):
+    """
+    Корректно останавливает стадии после того, как процессам A отправлены команды выхода.
+    Дожидается, пока процессы A дошлют накопленные сообщения, затем рассылает
+    команду выхода процессам B и после их завершения - читателю выходной очереди.
+    Если за timeout секунд сообщения в пути не успели пройти конвейер,
+    выставляет exit_event: стадии завершаются, отбрасывая оставшиеся сообщения.
+
+    Возвращает:
+        bool: True, если конвейер опустел до истечения timeout.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    def remaining():
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    for process in a_processes:
+        process.join(remaining())
+    drained = not any(process.is_alive() for process in a_processes)
+
+    if drained:
+        for _ in b_processes:
+            drained = drained and _put_control(ab_channel, "EXIT", remaining())
+        for process in b_processes:
+            process.join(remaining())
+        drained = drained and not any(process.is_alive() for process in b_processes)
+
+    if drained:
+        drained = _put_control(output_queue, "EXIT", remaining())
+    else:
+        exit_event.set()
+        for process in a_processes + b_processes:
+            process.join(WAIT_TIMEOUT * 2)
+    return drained
+
+
+def main(rate=DEFAULT_RATE, burst=DEFAULT_BURST, workers_a=1, workers_b=1,
+         batch_size=1, batch_window=DEFAULT_BATCH_WINDOW, ordered=False, transport="auto",
+         metrics_file=None, metrics_port=None, metrics_interval=DEFAULT_METRICS_INTERVAL,
+         queue_size=DEFAULT_QUEUE_SIZE, policy="block", drain_timeout=DEFAULT_DRAIN_TIMEOUT):
     """
     Главный процесс.
     Создает процессы A и B, а также очереди для взаимодействия.
+    По команде выхода или Ctrl+C дает стадиям drain_timeout секунд на обработку
+    сообщений в пути и только после этого принудительно завершает процессы.
     """
+    if policy not in QUEUE_POLICIES:
+        raise ValueError(f"Неизвестная политика переполнения: {policy}")
+
+    log_queue = multiprocessing.Queue()
+    listener = setup_logging(log_queue)
     
     exit_event = multiprocessing.Event()
+    metrics = PipelineMetrics()
     
     
-    input_queue = multiprocessing.Queue()    
-    output_queue = multiprocessing.Queue()   
+    input_queue = multiprocessing.Queue(queue_size)
+    output_queue = make_output_channel(transport, queue_size)
     
     
-    a_conn, b_conn = multiprocessing.Pipe()
+    a_processes, b_processes, ab_channel, backlog_sizes = start_stages(
+        input_queue, output_queue, exit_event,
+        workers_a=workers_a, workers_b=workers_b, rate=rate, burst=burst,
+        batch_size=batch_size, batch_window=batch_window, transport=transport,
+        metrics=metrics, log_queue=log_queue, queue_size=queue_size, policy=policy
+    )
     
     
-    process_a_instance = multiprocessing.Process(
-        target=process_a, 
-        args=(input_queue, a_conn, exit_event)
+    input_thread = threading.Thread(
+        target=input_reader,
+        args=(input_queue, exit_event, workers_a, metrics.add_stage("input"), policy),
+        daemon=True
     )
-    
-    process_b_instance = multiprocessing.Process(
-        target=process_b, 
-        args=(b_conn, output_queue, exit_event)
+    output_thread = threading.Thread(
+        target=output_reader, args=(output_queue, exit_event, ordered, metrics, queue_size)
     )
-    
-    
-    input_thread = threading.Thread(target=input_reader, args=(input_queue, exit_event))
-    output_thread = threading.Thread(target=output_reader, args=(output_queue, exit_event))
+    stop_metrics = start_metrics_export(metrics, metrics_file, metrics_port, metrics_interval)
     
     try:
-        print(f"[{datetime.datetime.now()}] Запуск приложения")
+        logger.info("Запуск приложения")
         
         
-        process_a_instance.start()
-        process_b_instance.start()
+        for process in a_processes + b_processes:
+            process.start()
         
         
         input_thread.start()
         output_thread.start()
         
         
-        input_thread.join()
-        output_thread.join()
-        
-        
-        process_a_instance.join()
-        process_b_instance.join()
+        try:
+            input_thread.join()
+        except KeyboardInterrupt:
+            logger.info("Получен сигнал прерывания, завершаем работу")
+            deadline = time.monotonic() + drain_timeout
+            for _ in a_processes:
+                _put_control(input_queue, "EXIT", max(0.0, deadline - time.monotonic()))
+
+        if not stop_stages(a_processes, b_processes, ab_channel, output_queue, exit_event, drain_timeout):
+            logger.info("Не удалось обработать все сообщения за %.1f с", drain_timeout)
+        output_thread.join(drain_timeout)
         
-    except KeyboardInterrupt:
-        print(f"[{datetime.datetime.now()}] Получен сигнал прерывания, завершаем работу")
-        exit_event.set()
     except Exception as e:
-        print(f"[{datetime.datetime.now()}] Ошибка: {e}")
+        logger.error("Ошибка: %s", e)
     finally:
+        exit_event.set()
+        output_thread.join(WAIT_TIMEOUT * 2)
+        for process in a_processes + b_processes:
+            if process.is_alive():
+                process.terminate()
         
-        if process_a_instance.is_alive():
-            process_a_instance.terminate()
-        if process_b_instance.is_alive():
-            process_b_instance.terminate()
+        stop_metrics()
+        # Итоговый снимок берется до закрытия каналов: их размеры входят в метрики
+        dropped = sum(stage["dropped"] for stage in metrics.snapshot()["stages"].values())
+        close_channel(ab_channel)
+        close_channel(output_queue)
         
-        print(f"[{datetime.datetime.now()}] Приложение завершено")
+        logger.info("Отброшено сообщений: %d", dropped)
+        logger.info("Приложение завершено")
+        listener.stop()
+
+
+async def _open_stdin_reader():
+    """
+    Возвращает асинхронную функцию чтения строки из stdin.
+    Для каналов и терминалов используется неблокирующий StreamReader;
+    обычные файлы не поддерживаются циклом событий, их строки читаются в пуле потоков.
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    except (ValueError, OSError):
+        async def readline():
+            return (await loop.run_in_executor(None, sys.stdin.buffer.readline))
+        return readline
+    return reader.readline
+
+
+async def async_input_reader(queue_a, counters):
+    """Корутина чтения ввода пользователя. Аналог input_reader."""
+    logger.info("Начало чтения пользовательского ввода. Введите 'exit' для завершения.")
+    readline = await _open_stdin_reader()
+
+    seq = 0
+    while True:
+        line = await readline()
+        if not line:
+            break
+        message = line.decode("utf-8").rstrip("\n")
+
+        if message.lower() == 'exit':
+            logger.info("Получена команда выхода")
+            break
+
+        counters[IN] += 1
+        await queue_a.put((seq, message, time.monotonic_ns()))
+        counters[OUT] += 1
+        logger.info("Отправлено в стадию A: '%s'", message)
+        seq += 1
+
+    await queue_a.put("EXIT")
+    logger.info("Чтение пользовательского ввода завершено")
+
+
+async def async_stage_a(queue_a, queue_b, counters, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+    """Корутина стадии A: .lower() с ограничением частоты token bucket. Аналог process_a."""
+    bucket = TokenBucket(rate, burst) if rate else None
+
+    while True:
+        message = await queue_a.get()
+        if message == "EXIT":
+            logger.info("Стадия A: получена команда выхода")
+            await queue_b.put("EXIT")
+            break
+
+        counters[IN] += 1
+        seq, text, stamp = message
+        processed_message = text.lower()
+        logger.info("Стадия A: получено '%s', обработано -> '%s'", text, processed_message)
+
+        if bucket is not None:
+            while not bucket.try_acquire():
+                await asyncio.sleep(bucket.delay())
+        await queue_b.put((seq, processed_message, stamp))
+        counters[OUT] += 1
+
+
+async def async_stage_b(queue_b, queue_out, counters):
+    """Корутина стадии B: rot13. Аналог process_b."""
+    while True:
+        message = await queue_b.get()
+        if message == "EXIT":
+            logger.info("Стадия B: получена команда выхода")
+            await queue_out.put("EXIT")
+            break
+
+        counters[IN] += 1
+        seq, text, stamp = message
+        encoded_message = codecs.encode(text, 'rot_13')
+        logger.info("Стадия B: получено '%s', закодировано -> '%s'", text, encoded_message)
+        await queue_out.put((seq, encoded_message, stamp))
+        counters[OUT] += 1
+
+
+async def async_output_reader(queue_out, metrics):
+    """Корутина чтения выходной очереди. Аналог output_reader."""
+    counters = metrics.add_stage("output")
+    logger.info("Начало чтения выходной очереди")
+    while True:
+        message = await queue_out.get()
+        if message == "EXIT":
+            logger.info("Получена команда выхода из стадии B")
+            break
+        _, text, stamp = message
+        counters[IN] += 1
+        metrics.latency.observe(time.monotonic_ns() - stamp)
+        logger.info("Получено от стадии B: '%s'", text)
+        counters[OUT] += 1
+    logger.info("Чтение выходной очереди завершено")
+
+
+async def async_main(rate=DEFAULT_RATE, burst=DEFAULT_BURST, queue_size=DEFAULT_QUEUE_SIZE,
+                     metrics_file=None, metrics_port=None, metrics_interval=DEFAULT_METRICS_INTERVAL):
+    """
+    Однопроцессный вариант конвейера ввод -> A -> B -> вывод на asyncio.
+    Очереди между стадиями ограничены queue_size сообщениями: если следующая
+    стадия не успевает, предыдущая ждет освобождения места, и память не растет.
+    """
+    listener = setup_logging(queue.SimpleQueue())
+    logger.info("Запуск приложения (asyncio)")
+
+    metrics = PipelineMetrics()
+    queue_a = asyncio.Queue(maxsize=queue_size)
+    queue_b = asyncio.Queue(maxsize=queue_size)
+    queue_out = asyncio.Queue(maxsize=queue_size)
+    metrics.add_gauge("input", queue_a.qsize)
+    metrics.add_gauge("ab_channel", queue_b.qsize)
+    metrics.add_gauge("output", queue_out.qsize)
+    stop_metrics = start_metrics_export(metrics, metrics_file, metrics_port, metrics_interval)
+
+    try:
+        await asyncio.gather(
+            async_input_reader(queue_a, metrics.add_stage("input")),
+            async_stage_a(queue_a, queue_b, metrics.add_stage("A"), rate, burst),
+            async_stage_b(queue_b, queue_out, metrics.add_stage("B")),
+            async_output_reader(queue_out, metrics),
+        )
+    finally:
+        stop_metrics()
+        logger.info("Приложение завершено")
+        listener.stop()
+
+
+def _start_benchmark_stages(workers_a, workers_b, batch_size, batch_window, transport):
+    """Запускает стадии A и B без ограничения частоты и без вывода сообщений."""
+    exit_event = multiprocessing.Event()
+    input_queue = multiprocessing.Queue()
+    output_queue = make_output_channel(transport)
+
+    a_processes, b_processes, ab_channel, _ = start_stages(
+        input_queue, output_queue, exit_event,
+        workers_a=workers_a, workers_b=workers_b, rate=None,
+        batch_size=batch_size, batch_window=batch_window, transport=transport
+    )
+    for process in a_processes + b_processes:
+        process.start()
+    return input_queue, output_queue, a_processes, b_processes, ab_channel, exit_event
+
+
+def _stop_benchmark_stages(input_queue, output_queue, a_processes, b_processes, ab_channel, exit_event):
+    for _ in a_processes:
+        input_queue.put("EXIT")
+    stop_stages(a_processes, b_processes, ab_channel, output_queue, exit_event)
+    close_channel(ab_channel)
+    close_channel(output_queue)
+
+
+def benchmark_throughput(n_messages, *, workers_a=1, workers_b=1, batch_size=1,
+                         batch_window=DEFAULT_BATCH_WINDOW, transport="auto",
+                         message_length=32):
+    """
+    Прогоняет n_messages сообщений длины message_length через стадии A и B
+    без ограничения частоты и возвращает пропускную способность в сообщениях в секунду.
+    """
+    stages = _start_benchmark_stages(workers_a, workers_b, batch_size, batch_window, transport)
+    input_queue, output_queue = stages[0], stages[1]
+    text = "Message " * (message_length // 8 + 1)
+
+    def feed():
+        for seq in range(n_messages):
+            input_queue.put((seq, text[:message_length], time.monotonic_ns()))
+
+    start_time = time.perf_counter()
+    feeder = threading.Thread(target=feed)
+    feeder.start()
+
+    received = 0
+    while received < n_messages:
+        received += len(output_queue.get())
+    elapsed = time.perf_counter() - start_time
+    feeder.join()
+
+    _stop_benchmark_stages(*stages)
+    return n_messages / elapsed
+
+
+def benchmark_latency(n_messages, *, transport="auto", message_length=32):
+    """
+    Отправляет n_messages сообщений по одному, дожидаясь каждого на выходе.
+    Возвращает медиану и 99-й перцентиль задержки в микросекундах.
+    """
+    stages = _start_benchmark_stages(1, 1, 1, DEFAULT_BATCH_WINDOW, transport)
+    input_queue, output_queue = stages[0], stages[1]
+    text = ("Message " * (message_length // 8 + 1))[:message_length]
+
+    latencies = []
+    for seq in range(n_messages):
+        start_time = time.perf_counter()
+        input_queue.put((seq, text, time.monotonic_ns()))
+        output_queue.get()
+        latencies.append((time.perf_counter() - start_time) * 1e6)
+
+    _stop_benchmark_stages(*stages)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def benchmark(n_messages=20000):
+    """Сравнение пропускной способности конвейера для разных размеров пачек и числа процессов."""
+    configurations = [
+        (workers, batch_size)
+        for workers in (1, 2, 4)
+        for batch_size in (1, 16, 128)
+    ]
+
+    lines = [
+        f"Пропускная способность конвейера A -> B, {n_messages} сообщений",
+        "",
+        "| Процессов в стадии | Размер пачки | Сообщений/с |",
+        "|--------------------|--------------|-------------|",
+    ]
+    print("\n".join(lines))
+    for workers, batch_size in configurations:
+        throughput = benchmark_throughput(
+            n_messages, workers_a=workers, workers_b=workers, batch_size=batch_size
+        )
+        line = f"| {workers:18d} | {batch_size:12d} | {throughput:11.0f} |"
+        print(line)
+        lines.append(line)
+
+    with open("artifacts/pipeline_benchmark_results.txt", "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def benchmark_transports(n_messages=20000, n_latency=1000):
+    """Сравнение задержки и пропускной способности транспортов Pipe/Queue и кольцевого буфера."""
+    lines = [
+        f"Сравнение транспортов между стадиями, {n_messages} сообщений, пачки по 64",
+        "",
+        "| Транспорт | Длина сообщения | Сообщений/с | Задержка p50 (мкс) | Задержка p99 (мкс) |",
+        "|-----------|-----------------|-------------|--------------------|--------------------|",
+    ]
+    print("\n".join(lines))
+    for transport in ("pipe", "queue", "shm"):
+        for message_length in (32, 4096):
+            throughput = benchmark_throughput(
+                n_messages, batch_size=64, transport=transport, message_length=message_length
+            )
+            p50, p99 = benchmark_latency(
+                n_latency, transport=transport, message_length=message_length
+            )
+            line = f"| {transport:9} | {message_length:15d} | {throughput:11.0f} | {p50:18.1f} | {p99:18.1f} |"
+            print(line)
+            lines.append(line)
+
+    with open("artifacts/transport_benchmark_results.txt", "w") as f:
+        f.write("\n".join(lines) + "\n")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Конвейер обработки сообщений A -> B")
+    parser.add_argument(
+        "--rate", type=float, default=DEFAULT_RATE,
+        help="Максимальная частота отправки из процесса A, сообщений в секунду (0 - без ограничения)"
+    )
+    parser.add_argument(
+        "--burst", type=int, default=DEFAULT_BURST,
+        help="Сколько сообщений процесс A может отправить подряд без ожидания"
+    )
+    parser.add_argument("--workers-a", type=int, default=1, help="Количество процессов стадии A (.lower())")
+    parser.add_argument("--workers-b", type=int, default=1, help="Количество процессов стадии B (rot13)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Максимальный размер пачки между стадиями")
+    parser.add_argument(
+        "--batch-window", type=float, default=DEFAULT_BATCH_WINDOW,
+        help="Максимальное время набора пачки, секунд"
+    )
+    parser.add_argument(
+        "--ordered", action="store_true",
+        help="Выводить результаты в исходном порядке сообщений"
+    )
+    parser.add_argument(
+        "--transport", choices=TRANSPORTS, default="auto",
+        help="Транспорт между стадиями: auto, pipe, queue или shm (кольцевой буфер в разделяемой памяти)"
+    )
+    parser.add_argument(
+        "--mode", choices=("processes", "async"), default="processes",
+        help="processes - стадии в отдельных процессах, async - все стадии в одном процессе на asyncio"
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+        help="Емкость очередей между стадиями"
+    )
+    parser.add_argument(
+        "--queue-policy", choices=QUEUE_POLICIES, default="block",
+        help="Что делать при переполнении очереди: ждать, выбросить старое или новое сообщение"
+    )
+    parser.add_argument(
+        "--drain-timeout", type=float, default=DEFAULT_DRAIN_TIMEOUT,
+        help="Сколько секунд при завершении ждать обработки сообщений в пути"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Файл, в который периодически дописываются метрики конвейера в формате JSON lines"
+    )
+    parser.add_argument(
+        "--metrics-port", type=int,
+        help="Порт на 127.0.0.1, на котором HTTP-сервер отдает текущие метрики в JSON"
+    )
+    parser.add_argument(
+        "--metrics-interval", type=float, default=DEFAULT_METRICS_INTERVAL,
+        help="Период записи метрик в файл, секунд"
+    )
+    parser.add_argument(
+        "--benchmark", action="store_true",
+        help="Измерить пропускную способность конвейера вместо интерактивного режима"
+    )
+    parser.add_argument(
+        "--benchmark-transports", action="store_true",
+        help="Сравнить задержку и пропускную способность транспортов"
+    )
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    elif args.benchmark_transports:
+        benchmark_transports()
+    elif args.mode == "async":
+        try:
+            asyncio.run(async_main(
+                rate=args.rate, burst=args.burst, queue_size=args.queue_size,
+                metrics_file=args.metrics_file, metrics_port=args.metrics_port,
+                metrics_interval=args.metrics_interval,
+            ))
+        except KeyboardInterrupt:
+            print("Получен сигнал прерывания, завершаем работу")
+    else:
+        main(
+            rate=args.rate, burst=args.burst,
+            workers_a=args.workers_a, workers_b=args.workers_b,
+            batch_size=args.batch_size, batch_window=args.batch_window,
+            ordered=args.ordered, transport=args.transport,
+            metrics_file=args.metrics_file, metrics_port=args.metrics_port,
+            metrics_interval=args.metrics_interval,
+            queue_size=args.queue_size, policy=args.queue_policy,
+            drain_timeout=args.drain_timeout,
+        )
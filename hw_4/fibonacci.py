@@ -2,6 +2,8 @@ import multiprocessing
 import threading
 import time
 
+from subinterpreters import call_in_subinterpreter, subinterpreters_supported, threading_mode
+
 
 def fibonacci(n):
     if n <= 1:
@@ -58,6 +60,34 @@ def process_execution(n, times):
     end_time = time.time()
     return end_time - start_time
 
+def subinterpreter_execution(n, times):
+    """Каждое вычисление в своем субинтерпретаторе со своим GIL; None, если они недоступны"""
+    if not subinterpreters_supported():
+        return None
+
+    start_time = time.time()
+    threads = []
+    results = [0] * times
+
+    def worker(idx):
+        results[idx] = call_in_subinterpreter(fibonacci, n)
+
+    for i in range(times):
+        thread = threading.Thread(target=worker, args=(i,))
+        threads.append(thread)
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    end_time = time.time()
+    return end_time - start_time
+
+def format_time(seconds):
+    if seconds is None:
+        return "пропущено (нужен Python 3.12+)"
+    return f"{seconds:.4f} секунд"
+
 def main():
     n = 35  
     times = 10  
@@ -68,16 +98,20 @@ def main():
     print(f"Синхронное выполнение: {sync_time:.4f} секунд")
     
     threaded_time = threaded_execution(n, times)
-    print(f"Многопоточное выполнение: {threaded_time:.4f} секунд")
+    print(f"Многопоточное выполнение ({threading_mode()}): {threaded_time:.4f} секунд")
     
     process_time = process_execution(n, times)
     print(f"Многопроцессное выполнение: {process_time:.4f} секунд")
+
+    subinterpreter_time = subinterpreter_execution(n, times)
+    print(f"Выполнение в субинтерпретаторах: {format_time(subinterpreter_time)}")
     
     with open("artifacts/fibonacci_results.txt", "w") as f:
         f.write(f"Вычисление чисел Фибоначчи для n={n}, {times} раз\n")
         f.write(f"Синхронное выполнение: {sync_time:.4f} секунд\n")
-        f.write(f"Многопоточное выполнение: {threaded_time:.4f} секунд\n")
+        f.write(f"Многопоточное выполнение ({threading_mode()}): {threaded_time:.4f} секунд\n")
         f.write(f"Многопроцессное выполнение: {process_time:.4f} секунд\n")
+        f.write(f"Выполнение в субинтерпретаторах: {format_time(subinterpreter_time)}\n")
 
 if __name__ == "__main__":
     main()
@@ -3,6 +3,8 @@ import math
 import multiprocessing
 import time
 
+from subinterpreters import call_in_subinterpreter, subinterpreters_supported, threading_mode
+
 
 def integrate(f, a, b, *, n_jobs=1, n_iter=10000000):
     acc = 0
@@ -71,6 +73,143 @@ def parallel_integrate_processes(f, a, b, *, n_jobs=1, n_iter=10000000):
         return sum(results)
 
 
+def parallel_integrate_subinterpreters(f, a, b, *, n_jobs=1, n_iter=10000000):
+    """
+    Интегрирование в субинтерпретаторах со своим GIL (Python 3.12+).
+
+    Части интеграла считаются как в parallel_integrate_threads, но каждый поток
+    запускает свою часть в отдельном субинтерпретаторе, поэтому потоки не ждут
+    общий GIL. f должна импортироваться по имени (например, math.cos).
+    """
+    if n_jobs <= 1:
+        return integrate(f, a, b, n_jobs=1, n_iter=n_iter)
+
+    chunk_size = n_iter // n_jobs
+    step = (b - a) / n_jobs
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        futures = []
+        for i in range(n_jobs):
+            start = a + i * step
+            end = a + (i + 1) * step
+
+            iter_count = chunk_size
+            if i == n_jobs - 1:
+                iter_count = n_iter - chunk_size * (n_jobs - 1)
+                end = b
+
+            futures.append(
+                executor.submit(call_in_subinterpreter, partial_integrate, f, start, end, iter_count)
+            )
+
+        results = [future.result() for future in futures]
+        return sum(results)
+
+
+def _normalize_job(job, n_iter):
+    """Приводит задание к виду (f, a, b, n_iter)."""
+    if len(job) == 3:
+        f, a, b = job
+        return f, a, b, n_iter
+    if len(job) == 4:
+        return tuple(job)
+    raise ValueError("Задание должно иметь вид (f, a, b) или (f, a, b, n_iter)")
+
+
+def _integrate_chunk(start_index, jobs):
+    """Вычисляет пачку интегралов, возвращает список пар (индекс, результат)."""
+    return [
+        (start_index + i, partial_integrate(f, a, b, n_iter))
+        for i, (f, a, b, n_iter) in enumerate(jobs)
+    ]
+
+
+def _iter_chunks(jobs, chunk_size, n_iter):
+    """Лениво разбивает поток заданий на пачки по chunk_size штук."""
+    chunk = []
+    start_index = 0
+    for index, job in enumerate(jobs):
+        chunk.append(_normalize_job(job, n_iter))
+        if len(chunk) == chunk_size:
+            yield start_index, chunk
+            start_index = index + 1
+            chunk = []
+    if chunk:
+        yield start_index, chunk
+
+
+def integrate_many(jobs, *, n_jobs=1, n_iter=10000000, chunk_size=16,
+                   ordered=False, executor=None):
+    """
+    Вычисляет множество интегралов на одном общем пуле процессов.
+
+    Задания (f, a, b) или (f, a, b, n_iter) отправляются в пул пачками по
+    chunk_size штук, так что на пачку приходится одна передача между процессами.
+    Одновременно в работе держится не больше 2 * n_jobs пачек, поэтому jobs
+    может быть ленивым итератором.
+
+    Аргументы:
+        jobs (iterable): Задания на интегрирование.
+        n_jobs (int): Количество процессов в пуле.
+        n_iter (int): Количество итераций для заданий без явного n_iter.
+        chunk_size (int): Количество заданий в одной пачке.
+        ordered (bool): Если True, результаты выдаются в порядке заданий,
+            иначе - по мере готовности.
+        executor (Executor, optional): Уже созданный пул; если передан,
+            он не закрывается по завершении.
+
+    Возвращает:
+        iterator: Пары (индекс задания, значение интеграла).
+    """
+    if chunk_size < 1:
+        raise ValueError("Размер пачки должен быть положительным")
+
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=max(n_jobs, 1))
+
+    max_in_flight = max(n_jobs, 1) * 2
+    chunks = _iter_chunks(jobs, chunk_size, n_iter)
+    pending = set()
+    buffered = {}
+    next_index = 0
+
+    def drain(done):
+        nonlocal next_index
+        for future in done:
+            for index, value in future.result():
+                buffered[index] = value
+        if ordered:
+            while next_index in buffered:
+                yield next_index, buffered.pop(next_index)
+                next_index += 1
+        else:
+            yield from buffered.items()
+            buffered.clear()
+
+    try:
+        for start_index, chunk in chunks:
+            pending.add(executor.submit(_integrate_chunk, start_index, chunk))
+            if len(pending) >= max_in_flight:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                yield from drain(done)
+
+        for future in concurrent.futures.as_completed(pending):
+            yield from drain([future])
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _format_time(seconds):
+    """Время для таблицы или "-", если режим пропущен."""
+    return "-" if seconds is None else f"{seconds:.4f}"
+
+
 def benchmark():
     """Сравнение производительности для разного количества потоков/процессов."""
     cpu_count = multiprocessing.cpu_count() 
@@ -80,12 +219,21 @@ def benchmark():
     jobs_list = list(range(1, max_jobs + 1))
     thread_times = []
     process_times = []
+    subinterpreter_times = []
+    use_subinterpreters = subinterpreters_supported()
+    result_subinterpreter = None
+    thread_title = f"ThreadPoolExecutor, {threading_mode()} (с)"
+    width = len(thread_title)
+    header = f"| n_jobs | {thread_title} | ProcessPoolExecutor (с) | Субинтерпретаторы (с) |"
+    separator = f"|--------|{'-' * (width + 2)}|--------------------------|-----------------------|"
     
     print(f"Сравнение времени интегрирования функции math.cos на отрезке [0, π/2]")
     print(f"Используется {n_iter} итераций и {cpu_count} ядер CPU")
+    if not use_subinterpreters:
+        print("Субинтерпретаторы недоступны (нужен Python 3.12+), столбец пропущен")
     print("-" * 60)
-    print("| n_jobs | ThreadPoolExecutor (с) | ProcessPoolExecutor (с) |")
-    print("|--------|------------------------|--------------------------|")
+    print(header)
+    print(separator)
     
     for n_jobs in jobs_list:
         start_time = time.time()
@@ -97,8 +245,17 @@ def benchmark():
         result_process = parallel_integrate_processes(math.cos, 0, math.pi / 2, n_jobs=n_jobs, n_iter=n_iter)
         process_time = time.time() - start_time
         process_times.append(process_time)
+
+        subinterpreter_time = None
+        if use_subinterpreters:
+            start_time = time.time()
+            result_subinterpreter = parallel_integrate_subinterpreters(
+                math.cos, 0, math.pi / 2, n_jobs=n_jobs, n_iter=n_iter
+            )
+            subinterpreter_time = time.time() - start_time
+        subinterpreter_times.append(subinterpreter_time)
         
-        print(f"| {n_jobs:6d} | {thread_time:22.4f} | {process_time:24.4f} |")
+        print(f"| {n_jobs:6d} | {thread_time:{width}.4f} | {process_time:24.4f} | {_format_time(subinterpreter_time):>21} |")
     
     exact_result = 1.0 
     
@@ -106,19 +263,47 @@ def benchmark():
     print(f"Точное значение интеграла: {exact_result}")
     print(f"Рассчитанное значение (потоки): {result_thread:.10f}")
     print(f"Рассчитанное значение (процессы): {result_process:.10f}")
+    if result_subinterpreter is not None:
+        print(f"Рассчитанное значение (субинтерпретаторы): {result_subinterpreter:.10f}")
     
     with open("artifacts/integration_benchmark_results.txt", "w") as f:
         f.write(f"Сравнение времени интегрирования функции math.cos на отрезке [0, π/2]\n")
-        f.write(f"Используется {n_iter} итераций и {cpu_count} ядер CPU\n\n")
-        f.write("| n_jobs | ThreadPoolExecutor (с) | ProcessPoolExecutor (с) |\n")
-        f.write("|--------|------------------------|------------------------|\n")
+        f.write(f"Используется {n_iter} итераций и {cpu_count} ядер CPU\n")
+        if not use_subinterpreters:
+            f.write("Субинтерпретаторы недоступны (нужен Python 3.12+), столбец пропущен\n")
+        f.write("\n")
+        f.write(header + "\n")
+        f.write(separator + "\n")
         
         for i, n_jobs in enumerate(jobs_list):
-            f.write(f"| {n_jobs:6d} | {thread_times[i]:22.4f} | {process_times[i]:24.4f} |\n")
+            f.write(
+                f"| {n_jobs:6d} | {thread_times[i]:{width}.4f} | {process_times[i]:24.4f} "
+                f"| {_format_time(subinterpreter_times[i]):>21} |\n"
+            )
         
         f.write("\nТочное значение интеграла: 1.0\n")
         f.write(f"Рассчитанное значение (потоки): {result_thread:.10f}\n")
-        f.write(f"Рассчитанное значение (процессы): {result_process:.10f}\n\n") 
+        f.write(f"Рассчитанное значение (процессы): {result_process:.10f}\n")
+        if result_subinterpreter is not None:
+            f.write(f"Рассчитанное значение (субинтерпретаторы): {result_subinterpreter:.10f}\n")
+        f.write("\n")
 
 if __name__ == "__main__":
-    benchmark()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Сравнение способов численного интегрирования")
+    parser.add_argument(
+        "--monte-carlo", action="store_true",
+        help="Сравнить методы Монте-Карло на многомерном интеграле вместо потоков и процессов"
+    )
+    parser.add_argument("--tol", type=float, default=1e-4, help="Целевая стандартная ошибка для --monte-carlo")
+    parser.add_argument("--jobs", type=int, help="Количество процессов для --monte-carlo")
+    args = parser.parse_args()
+
+    if args.monte_carlo:
+        # numpy нужен только здесь: без него integrate импортируется в субинтерпретаторах
+        from monte_carlo import benchmark_monte_carlo
+
+        benchmark_monte_carlo(tol=args.tol, n_jobs=args.jobs)
+    else:
+        benchmark()
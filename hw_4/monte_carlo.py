@@ -0,0 +1,272 @@
+import collections
+import concurrent.futures
+import math
+import multiprocessing
+import time
+
+import numpy as np
+
+
+MonteCarloResult = collections.namedtuple(
+    "MonteCarloResult", ["value", "stderr", "n_samples", "converged"]
+)
+
+MONTE_CARLO_METHODS = ("random", "sobol", "halton")
+
+# Направляющие числа Соболя (Joe, Kuo, new-joe-kuo-6.21201) для измерений 2..13:
+# (степень многочлена s, коэффициенты a, начальные m_1..m_s); первое измерение - ван дер Корпут
+SOBOL_DIRECTIONS = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+)
+SOBOL_BITS = 32
+
+
+def _sobol_matrix(dimensions):
+    """Направляющие числа V[d, k] последовательности Соболя в виде 32-битных целых."""
+    if dimensions > len(SOBOL_DIRECTIONS) + 1:
+        raise ValueError(
+            f"Последовательность Соболя поддерживает до {len(SOBOL_DIRECTIONS) + 1} измерений"
+        )
+    matrix = np.zeros((dimensions, SOBOL_BITS), dtype=np.uint64)
+    matrix[0] = [1 << (SOBOL_BITS - 1 - k) for k in range(SOBOL_BITS)]
+    for dim in range(1, dimensions):
+        s, a, m = SOBOL_DIRECTIONS[dim - 1]
+        v = [m[k] << (SOBOL_BITS - 1 - k) for k in range(s)]
+        for k in range(s, SOBOL_BITS):
+            value = v[k - s] ^ (v[k - s] >> s)
+            for j in range(1, s):
+                if (a >> (s - 1 - j)) & 1:
+                    value ^= v[k - j]
+            v.append(value)
+        matrix[dim] = v
+    return matrix
+
+
+def _primes(count):
+    """Первые count простых чисел - основания последовательности Холтона."""
+    primes = []
+    candidate = 2
+    while len(primes) < count:
+        if all(candidate % p for p in primes if p * p <= candidate):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+def _sobol_points(start, count, dimensions, shift):
+    """Точки Соболя с номерами [start, start + count) с цифровым сдвигом shift (XOR)."""
+    index = np.arange(start, start + count, dtype=np.uint64)
+    matrix = _sobol_matrix(dimensions)
+    points = np.zeros((count, dimensions), dtype=np.uint64)
+    bit = 0
+    while (start + count - 1) >> bit:
+        mask = ((index >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+        points[mask] ^= matrix[:, bit]
+        bit += 1
+    points ^= np.asarray(shift, dtype=np.uint64)
+    return points * 2.0 ** -SOBOL_BITS
+
+
+def _halton_points(start, count, dimensions, shift):
+    """Точки Холтона с номерами [start, start + count) со случайным сдвигом по модулю 1."""
+    index = np.arange(start, start + count, dtype=np.int64)
+    points = np.empty((count, dimensions))
+    for dim, base in enumerate(_primes(dimensions)):
+        rest = index.copy()
+        value = np.zeros(count)
+        factor = 1.0 / base
+        while rest.any():
+            value += factor * (rest % base)
+            rest //= base
+            factor /= base
+        points[:, dim] = value
+    return (points + shift) % 1.0
+
+
+def _monte_carlo_batch(f, low, high, method, stream, start, count):
+    """
+    Вычисляет f в count точках одного потока, возвращает (count, среднее, сумма квадратов отклонений).
+
+    stream - SeedSequence пачки для метода random или сдвиг потока для sobol/halton.
+    """
+    dimensions = len(low)
+    if method == "random":
+        unit = np.random.default_rng(stream).random((count, dimensions))
+    elif method == "sobol":
+        unit = _sobol_points(start, count, dimensions, stream)
+    else:
+        unit = _halton_points(start, count, dimensions, stream)
+
+    values = np.asarray(f(low + unit * (high - low)), dtype=float)
+    mean = values.mean()
+    return count, mean, float(((values - mean) ** 2).sum())
+
+
+def _merge_moments(left, right):
+    """Объединяет (n, среднее, M2) двух выборок (формула Чана)."""
+    n_left, mean_left, m2_left = left
+    n_right, mean_right, m2_right = right
+    n = n_left + n_right
+    delta = mean_right - mean_left
+    mean = mean_left + delta * n_right / n
+    m2 = m2_left + m2_right + delta ** 2 * n_left * n_right / n
+    return n, mean, m2
+
+
+def iter_monte_carlo(f, bounds, *, method="random", n_jobs=1, n_streams=None,
+                     batch_size=65536, max_samples=10000000, seed=None, executor=None):
+    """
+    Интегрирование методом Монте-Карло по прямоугольной области любой размерности.
+
+    Выборка делится на n_streams независимых потоков. Каждый раунд каждый поток
+    вычисляет f на очередной пачке из batch_size точек (пачки идут в пул процессов),
+    после раунда выдается текущая оценка. Потоки получают независимые генераторы
+    через SeedSequence.spawn: для random - свою SeedSequence на каждую пачку,
+    для sobol/halton - случайный сдвиг последовательности (рандомизированный квази-Монте-Карло).
+
+    Стандартная ошибка для random считается по всей выборке, для sobol/halton -
+    по разбросу оценок независимо сдвинутых потоков.
+
+    Аргументы:
+        f (callable): Векторизованная функция: массив точек (n, d) -> массив значений (n,).
+            Для n_jobs > 1 должна импортироваться по имени (передается в процессы).
+        bounds (sequence): Пары (нижняя, верхняя граница) по каждому измерению.
+        method (str): "random", "sobol" или "halton".
+        n_jobs (int): Количество процессов; 1 - вычисление в текущем процессе.
+        n_streams (int, optional): Количество потоков выборки, по умолчанию max(n_jobs, 8).
+        batch_size (int): Точек в одной пачке потока (для sobol лучше степень двойки).
+        max_samples (int): Максимальное общее количество точек.
+        seed (int, optional): Зерно для воспроизводимости.
+        executor (Executor, optional): Уже созданный пул; если передан, он не закрывается.
+
+    Возвращает:
+        iterator: MonteCarloResult после каждого раунда (converged всегда False).
+    """
+    if method not in MONTE_CARLO_METHODS:
+        raise ValueError(f"Неизвестный метод: {method}, допустимы {', '.join(MONTE_CARLO_METHODS)}")
+    low, high = (np.array(side, dtype=float) for side in zip(*bounds))
+    dimensions = len(low)
+    if method == "sobol":
+        _sobol_matrix(dimensions)
+    volume = float(np.prod(high - low))
+    n_streams = n_streams or max(n_jobs, 8)
+    if method != "random" and n_streams < 2:
+        raise ValueError("Для оценки ошибки квази-Монте-Карло нужно хотя бы 2 потока")
+    if max_samples < n_streams:
+        raise ValueError("max_samples должно быть не меньше количества потоков")
+
+    streams = np.random.SeedSequence(seed).spawn(n_streams)
+    if method == "sobol":
+        shifts = [
+            np.random.default_rng(s).integers(0, 2 ** SOBOL_BITS, dimensions, dtype=np.uint64)
+            for s in streams
+        ]
+    elif method == "halton":
+        shifts = [np.random.default_rng(s).random(dimensions) for s in streams]
+
+    own_executor = executor is None and n_jobs > 1
+    if own_executor:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=n_jobs)
+
+    moments = [(0, 0.0, 0.0)] * n_streams
+    start = 0
+    try:
+        while True:
+            count = min(batch_size, (max_samples - start * n_streams) // n_streams)
+            if count <= 0:
+                break
+            tasks = [
+                (f, low, high, method,
+                 stream.spawn(1)[0] if method == "random" else shifts[i], start, count)
+                for i, stream in enumerate(streams)
+            ]
+            if executor is None:
+                batches = [_monte_carlo_batch(*task) for task in tasks]
+            else:
+                batches = list(executor.map(_monte_carlo_batch, *zip(*tasks)))
+            moments = [_merge_moments(m, b) for m, b in zip(moments, batches)]
+            start += count
+
+            total = (0, 0.0, 0.0)
+            for m in moments:
+                total = _merge_moments(total, m)
+            n_samples, mean, m2 = total
+            if method == "random":
+                stderr = math.sqrt(m2 / (n_samples - 1) / n_samples) if n_samples > 1 else math.inf
+            else:
+                means = np.array([m[1] for m in moments])
+                stderr = float(means.std(ddof=1) / math.sqrt(n_streams))
+            yield MonteCarloResult(float(volume * mean), volume * stderr, n_samples, False)
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def monte_carlo_integrate(f, bounds, *, tol=None, min_samples=0, **kwargs):
+    """
+    Интеграл f по прямоугольной области методом Монте-Карло / квази-Монте-Карло.
+
+    Вычисление останавливается, как только стандартная ошибка станет не больше tol
+    (после набора min_samples точек), или по исчерпании max_samples. Остальные
+    аргументы - как у iter_monte_carlo.
+
+    Возвращает:
+        MonteCarloResult: значение, стандартная ошибка, число точек и признак
+        достижения tol.
+    """
+    result = None
+    for result in iter_monte_carlo(f, bounds, **kwargs):
+        if tol is not None and result.n_samples >= min_samples and result.stderr <= tol:
+            return result._replace(converged=True)
+    return result
+
+
+def gaussian_product(points):
+    """Тестовая функция exp(-|x|^2) = prod exp(-x_i^2), интеграл по [0, 1]^d известен точно."""
+    return np.exp(-np.sum(points * points, axis=1))
+
+
+def benchmark_monte_carlo(dimensions_list=(3, 6, 10), tol=1e-4, n_jobs=None):
+    """Сравнение методов Монте-Карло на exp(-|x|^2) по [0, 1]^d до заданной точности."""
+    cpu_count = multiprocessing.cpu_count()
+    n_jobs = n_jobs or min(cpu_count, 4)
+    header = "| d | Метод | Значение | Ошибка | Станд. ошибка | Точек | Время (с) |"
+    separator = "|---|-------|----------|--------|---------------|-------|-----------|"
+    lines = [
+        f"Интеграл exp(-|x|^2) по [0, 1]^d, целевая стандартная ошибка {tol}, "
+        f"{n_jobs} процессов, {cpu_count} ядер CPU",
+        "",
+        header,
+        separator,
+    ]
+    print("\n".join(lines))
+
+    for dimensions in dimensions_list:
+        exact = (math.sqrt(math.pi) / 2 * math.erf(1)) ** dimensions
+        for method in MONTE_CARLO_METHODS:
+            start_time = time.time()
+            result = monte_carlo_integrate(
+                gaussian_product, [(0, 1)] * dimensions, method=method,
+                tol=tol, n_jobs=n_jobs, seed=0
+            )
+            elapsed = time.time() - start_time
+            line = (
+                f"| {dimensions} | {method} | {result.value:.8f} | {abs(result.value - exact):.2e} "
+                f"| {result.stderr:.2e} | {result.n_samples} | {elapsed:.4f} |"
+            )
+            print(line)
+            lines.append(line)
+
+    with open("artifacts/monte_carlo_results.txt", "w") as f:
+        f.write("\n".join(lines) + "\n")
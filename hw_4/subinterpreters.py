@@ -0,0 +1,123 @@
+import ast
+import os
+import sys
+import sysconfig
+import threading
+
+# Субинтерпретаторы с собственным GIL появились в Python 3.12; до выхода
+# concurrent.interpreters доступ к ним есть только через внутренние модули
+try:
+    import _interpreters as _backend  # Python 3.13+
+    _run = _backend.exec
+except ImportError:
+    try:
+        import _xxsubinterpreters as _backend  # Python 3.12
+        _run = _backend.run_string
+    except ImportError:
+        _backend = None
+        _run = None
+
+_SCRIPT = """
+import ast, importlib, os, sys
+sys.path[:0] = {path!r}
+
+def resolve(reference):
+    module_name, _, name = reference.partition(":")
+    target = importlib.import_module(module_name)
+    for part in name.split("."):
+        target = getattr(target, part)
+    return target
+
+args = [resolve(value) if kind == "ref" else ast.literal_eval(value) for kind, value in {args!r}]
+data = repr(resolve({func!r})(*args)).encode()
+while data:
+    data = data[os.write({fd}, data):]
+"""
+
+
+def subinterpreters_supported():
+    """True, если доступны субинтерпретаторы с собственным GIL (Python 3.12+)"""
+    return _backend is not None and sys.version_info >= (3, 12)
+
+
+def free_threading_enabled():
+    """True, если интерпретатор собран без GIL (free-threaded) и GIL не включен обратно"""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)
+    return bool(sysconfig.get_config_var("Py_GIL_DISABLED")) and not is_gil_enabled()
+
+
+def threading_mode():
+    """Описание режима потоков для заголовков таблиц"""
+    return "без GIL" if free_threading_enabled() else "с GIL"
+
+
+def _reference(func):
+    """
+    Ссылка "модуль:имя" на функцию, по которой ее можно импортировать в субинтерпретаторе.
+    Функции из запущенного скрипта (__main__) импортируются по имени файла скрипта.
+    """
+    module_name = func.__module__
+    path = []
+    if module_name == "__main__":
+        main_file = os.path.abspath(sys.modules["__main__"].__file__)
+        module_name = os.path.splitext(os.path.basename(main_file))[0]
+        path.append(os.path.dirname(main_file))
+    return f"{module_name}:{func.__qualname__}", path
+
+
+def call_in_subinterpreter(func, *args):
+    """
+    Вызывает func(*args) в новом изолированном субинтерпретаторе и возвращает результат.
+
+    Функция и аргументы-функции передаются ссылкой и импортируются заново,
+    остальные аргументы и результат - через repr, поэтому подходят числа, строки
+    и их контейнеры. Результат читается из канала в отдельном потоке, пока
+    субинтерпретатор работает, поэтому его размер не ограничен буфером канала.
+    Вызов блокирует только текущий поток: субинтерпретатор работает со своим GIL,
+    и несколько таких вызовов из разных потоков идут параллельно.
+    """
+    if not subinterpreters_supported():
+        raise RuntimeError("Субинтерпретаторы недоступны, нужен Python 3.12+")
+
+    func_ref, path = _reference(func)
+    encoded = []
+    for value in args:
+        if callable(value):
+            value_ref, value_path = _reference(value)
+            encoded.append(("ref", value_ref))
+            path.extend(value_path)
+        else:
+            encoded.append(("literal", repr(value)))
+    path.extend(entry for entry in sys.path if entry)
+
+    read_fd, write_fd = os.pipe()
+    chunks = []
+
+    def drain():
+        while chunk := os.read(read_fd, 65536):
+            chunks.append(chunk)
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    interpreter = _backend.create()
+    try:
+        script = _SCRIPT.format(path=path, args=encoded, fd=write_fd, func=func_ref)
+        try:
+            # Python 3.13+ возвращает описание исключения, Python 3.12 выбрасывает RunFailedError
+            error = _run(interpreter, script)
+        except getattr(_backend, "RunFailedError", ()) as e:
+            error = e
+        os.close(write_fd)
+        write_fd = None
+        reader.join()
+        if error is not None:
+            message = getattr(error, "formatted", None) or str(error)
+            raise RuntimeError(f"Ошибка в субинтерпретаторе: {message}")
+        return ast.literal_eval(b"".join(chunks).decode())
+    finally:
+        _backend.destroy(interpreter)
+        if write_fd is not None:
+            # Закрытие записывающего конца завершает поток чтения
+            os.close(write_fd)
+            reader.join()
+        os.close(read_fd)
@@ -1,82 +1,1184 @@
 import argparse
 import asyncio
+import collections
+import contextlib
+import email.utils
+import hashlib
+import json
+import math
+import multiprocessing
 import os
+import random
+import socket
+import sys
+import tempfile
+import threading
 import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import AsyncIterator
+from urllib.parse import unquote, urlparse
 
 import aiohttp
 import aiofiles
+from aiohttp import web
 
+DEFAULT_URL = "https://thispersondoesnotexist.com"
+DEFAULT_FOLDER = "hw_5/artifacts"
+DEFAULT_CONCURRENCY = 10
+DEFAULT_PER_HOST_LIMIT = 10
+CHUNK_SIZE = 64 * 1024
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_READ_TIMEOUT = 30.0
+
+LINK_MODES = ("hardlink", "symlink")
+# Рядом с недокачанным *.part хранится ETag/Last-Modified версии, к которой он относится
+PART_META_SUFFIX = ".meta"
+# Число блокировок, между которыми распределяются объекты хранилища при коммите
+COMMIT_LOCK_STRIPES = 64
+# Сколько байт манифеста читать за одно обращение к файлу
+MANIFEST_BATCH_BYTES = 64 * 1024
+DEFAULT_CHECKPOINT_INTERVAL = 5.0
+
+BENCHMARK_CONCURRENCY = (10, 100, 1000, 10000)
+BENCHMARK_RESULTS = os.path.join(DEFAULT_FOLDER, "download_benchmark_results.txt")
+
+# Коды ответа, после которых имеет смысл повторить запрос
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Параметры повторных попыток: число повторов и границы экспоненциальной задержки."""
+    max_retries: int = 5
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """
+        Задержка перед повтором номер attempt (с нуля): случайная величина от 0 до
+        backoff_base * 2 ** attempt, но не больше backoff_max. Если сервер прислал
+        Retry-After, ждем не меньше указанного им времени.
+        """
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class RetryableError(Exception):
+    """Временная ошибка скачивания, после которой запрос можно повторить."""
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
 
-async def download_ai_face(
-    session: aiohttp.ClientSession, index: int, folder: str
-) -> str:
-    """Скачивает сгенерированное ИИ изображение лица с thispersondoesnotexist.com."""    
-    start_time = time.time()
-    print(f"[{time.time():.2f}] Начинаю скачивание изображения {index}")
-    
-    url = "https://thispersondoesnotexist.com"
-    filename = os.path.join(folder, f"ai_face_{index}.jpg")
 
+def parse_retry_after(value: str | None) -> float | None:
+    """Разбирает заголовок Retry-After (число секунд или HTTP-дата) в секунды ожидания."""
+    if not value:
+        return None
     try:
-        async with session.get(url) as response:
-            if response.status == 200:
-                content = await response.read()
-                # Асинхронная запись файла
-                async with aiofiles.open(filename, "wb") as f:
-                    await f.write(content)          
-                elapsed = time.time() - start_time
-                print(f"[{time.time():.2f}] Скачано изображение {index}. Размер: {len(content)} байт. Время: {elapsed:.2f} сек")
-                return filename
-            else:
-                print(f"[{time.time():.2f}] Ошибка при скачивании изображения {index}: {response.status}")
-                return None
-    except Exception as e:
-        print(f"[{time.time():.2f}] Исключение при скачивании изображения {index}: {e}")
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _hash_file(path: str) -> "hashlib._Hash":
+    """Возвращает объект sha256, заполненный содержимым файла path."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest
+
+
+class ContentStore:
+    """
+    Хранилище скачанных файлов с адресацией по содержимому.
+
+    Каждое уникальное тело ответа лежит один раз в folder/.objects/<sha256[:2]>/<sha256>,
+    а файлы с понятными именами (ai_face_N.jpg) - жесткие или символические ссылки
+    на него, поэтому одинаковое содержимое не занимает место повторно.
+    В folder/.index.jsonl для каждого имени хранятся адрес, ETag, Last-Modified
+    и хэш содержимого, по которым следующий запуск делает условные запросы.
+    Индекс дописывается: save добавляет только записи, измененные с прошлого
+    сохранения, а при чтении побеждает последняя запись имени. close переписывает
+    индекс по одной строке на имя.
+    """
+    def __init__(self, folder: str, link_mode: str = "hardlink"):
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"Неизвестный способ связывания: {link_mode}")
+        self.folder = folder
+        self.objects = os.path.join(folder, ".objects")
+        self.index_path = os.path.join(folder, ".index.jsonl")
+        # Индекс в формате JSON целиком от прежних версий: читается и заменяется при close
+        self.legacy_index_path = os.path.join(folder, ".index.json")
+        self.link_mode = link_mode
+        self.entries = {}
+        # Записи, еще не дописанные в индекс
+        self._journal = []
+        # Коммиты выполняются в потоках исполнителя; один объект переносится одним потоком.
+        # Блокировки закреплены за частями пространства хэшей, а не за каждым объектом,
+        # поэтому их число не растет с числом скачанных файлов
+        self._locks = [threading.Lock() for _ in range(COMMIT_LOCK_STRIPES)]
+
+    def load(self) -> None:
+        """
+        Создает папки хранилища и читает индекс метаданных, если он есть.
+        Оборванная при сбое последняя строка пропускается, а индекс, в котором
+        устаревших записей больше, чем актуальных, сразу переписывается.
+        """
+        Path(self.objects).mkdir(exist_ok=True, parents=True)
+        if os.path.exists(self.legacy_index_path):
+            with open(self.legacy_index_path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        if not os.path.exists(self.index_path):
+            return
+
+        records = 0
+        damaged = False
+        with open(self.index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self.entries[record.pop("name")] = record
+                    records += 1
+                except (ValueError, KeyError, AttributeError):
+                    damaged = True
+        if damaged or records > 2 * len(self.entries):
+            self.close()
+
+    def save(self) -> None:
+        """Дописывает в индекс записи, измененные с прошлого сохранения."""
+        # Список подменяется под GIL: цикл событий может добавлять записи,
+        # пока файл пишется в потоке исполнителя
+        journal, self._journal = self._journal, []
+        if not journal:
+            return
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in journal))
+
+    def close(self) -> None:
+        """Атомарно переписывает индекс по одной актуальной записи на имя."""
+        self._journal = []
+        entries = dict(self.entries)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for name, entry in entries.items():
+                f.write(json.dumps({"name": name, **entry}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.index_path)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.legacy_index_path)
+
+    def cached(self, name: str, url: str) -> dict | None:
+        """Запись индекса для имени name, если она относится к url и файл на месте."""
+        entry = self.entries.get(name)
+        if entry and entry.get("url") == url and os.path.exists(os.path.join(self.folder, name)):
+            return entry
         return None
 
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects, sha256[:2], sha256)
+
+    def commit(self, part_name: str, sha256: str, name: str) -> bool:
+        """
+        Переносит скачанный файл part_name в хранилище и ссылается на него под именем name.
+        Возвращает True, если такое содержимое уже было в хранилище.
+        """
+        object_path = self.object_path(sha256)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        with self._locks[int(sha256[:8], 16) % COMMIT_LOCK_STRIPES]:
+            try:
+                # link не перезаписывает существующий файл, поэтому объект, на который
+                # уже ссылаются имена, не подменяется и при гонке между процессами
+                os.link(part_name, object_path)
+                duplicate = False
+            except FileExistsError:
+                duplicate = True
+            except OSError:
+                # Файловая система без жестких ссылок
+                duplicate = os.path.exists(object_path)
+                if not duplicate:
+                    os.replace(part_name, object_path)
+            if os.path.exists(part_name):
+                os.remove(part_name)
+
+        target = os.path.join(self.folder, name)
+        tmp_link = target + ".link"
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        if self.link_mode == "hardlink":
+            try:
+                os.link(object_path, tmp_link)
+            except OSError:
+                os.symlink(os.path.abspath(object_path), tmp_link)
+        else:
+            os.symlink(os.path.abspath(object_path), tmp_link)
+        os.replace(tmp_link, target)
+        return duplicate
+
+    def remember(self, name: str, url: str, sha256: str, size: int, validator: dict) -> None:
+        entry = {
+            "url": url,
+            "sha256": sha256,
+            "size": size,
+            "etag": validator.get("etag"),
+            "last_modified": validator.get("last_modified"),
+        }
+        self.entries[name] = entry
+        self._journal.append({"name": name, **entry})
+
+
+def _if_range_value(validator: dict) -> str | None:
+    """Значение If-Range: сильный ETag или Last-Modified (слабый ETag в If-Range недопустим)."""
+    etag = validator.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return validator.get("last_modified")
+
+
+def _load_part_validator(part_name: str, url: str) -> dict:
+    """ETag/Last-Modified недокачанного part_name из прошлого запуска, если он относится к url."""
+    try:
+        with open(part_name + PART_META_SUFFIX, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if meta.get("url") != url:
+        return {}
+    return {"etag": meta.get("etag"), "last_modified": meta.get("last_modified")}
+
+
+def _save_part_validator(part_name: str, url: str, validator: dict) -> None:
+    with open(part_name + PART_META_SUFFIX, "w", encoding="utf-8") as f:
+        json.dump({"url": url, **validator}, f)
+
+
+def _discard_part(part_name: str) -> None:
+    """Удаляет недокачанный файл и его метаданные."""
+    for path in (part_name, part_name + PART_META_SUFFIX):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+async def _fetch_to_file(
+    session: aiohttp.ClientSession,
+    url: str,
+    part_name: str,
+    validator: dict,
+    cached: dict | None = None,
+    trace: dict | None = None,
+) -> tuple[int, str | None]:
+    """
+    Один запрос: докачивает url во временный файл part_name, считая sha256
+    содержимого по ходу записи.
+    Если файл уже частично скачан, запрашивает недостающий хвост через Range;
+    If-Range с ETag/Last-Modified из validator (или из файла part_name.meta,
+    оставшегося от прошлого запуска) гарантирует, что хвост относится к той же
+    версии ресурса, иначе сервер вернет его целиком. Недокачанный файл, версия
+    которого неизвестна, удаляется и скачивается заново.
+    Если есть запись cached из индекса, запрос делается условным
+    (If-None-Match/If-Modified-Since).
+    Словарь trace передается в трассировку aiohttp и заполняется временами
+    этапов запроса (см. DownloadMetrics).
 
-async def main(count: int):
+    Возвращает:
+        tuple: (размер файла, sha256) или (0, None), если ресурс не изменился.
+    """
+    loop = asyncio.get_running_loop()
+    offset = os.path.getsize(part_name) if os.path.exists(part_name) else 0
+    if offset and not _if_range_value(validator):
+        validator.update(_load_part_validator(part_name, url))
+        if not _if_range_value(validator):
+            _discard_part(part_name)
+            offset = 0
+    headers = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = _if_range_value(validator)
+    elif cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    async with session.get(url, headers=headers, trace_request_ctx=trace) as response:
+        if response.status == 304 and cached:
+            return 0, None
+        if response.status == 416 and offset:
+            digest = await loop.run_in_executor(None, _hash_file, part_name)
+            return offset, digest.hexdigest()
+        if response.status in RETRY_STATUSES:
+            raise RetryableError(
+                f"HTTP {response.status}", parse_retry_after(response.headers.get("Retry-After"))
+            )
+        if response.status not in (200, 206):
+            raise aiohttp.ClientResponseError(
+                response.request_info, response.history, status=response.status
+            )
+
+        if response.status == 206 and offset:
+            # Не все серверы учитывают If-Range: хвост другой версии нельзя дописывать
+            changed = any(
+                validator.get(key) and response.headers.get(header) != validator[key]
+                for key, header in (("etag", "ETag"), ("last_modified", "Last-Modified"))
+            )
+            if changed:
+                _discard_part(part_name)
+                validator.clear()
+                raise RetryableError("Ресурс изменился во время докачки")
+        validator["etag"] = response.headers.get("ETag")
+        validator["last_modified"] = response.headers.get("Last-Modified")
+        await loop.run_in_executor(None, _save_part_validator, part_name, url, validator)
+        if response.status == 206:
+            mode, size = "ab", offset
+            digest = await loop.run_in_executor(None, _hash_file, part_name)
+        else:
+            mode, size = "wb", 0
+            digest = hashlib.sha256()
+        # Асинхронная запись файла по мере получения данных
+        async with aiofiles.open(part_name, mode) as f:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                digest.update(chunk)
+                await f.write(chunk)
+                size += len(chunk)
+                if trace is not None:
+                    trace["bytes"] = trace.get("bytes", 0) + len(chunk)
+        return size, digest.hexdigest()
+
+
+async def download_file(
+    session: aiohttp.ClientSession,
+    url: str,
+    name: str,
+    store: ContentStore,
+    retry: RetryPolicy = RetryPolicy(),
+    stats: dict | None = None,
+) -> dict:
+    """
+    Скачивает url в хранилище store под именем name.
+
+    Тело ответа пишется на диск частями по CHUNK_SIZE байт во временный файл
+    *.part, затем переносится в хранилище и связывается с именем name.
+    Если ресурс не изменился с прошлого запуска, сервер отвечает 304 и файл
+    не скачивается повторно.
+    Обрыв соединения, таймаут или временная ошибка сервера приводят к повтору
+    с экспоненциальной задержкой; повтор докачивает недостающую часть файла.
+    Число повторов по каждому адресу накапливается в stats["retries"].
+
+    Возвращает:
+        dict: результат со статусом "ok", "not_modified" или "failed",
+        размером и sha256 содержимого либо текстом ошибки.
+    """
     start_time = time.time()
-    print(f"[{time.time():.2f}] Начало выполнения")
-    
-    artifacts_folder = "hw_5/artifacts"
-    
-    # Создаем директорию до начала асинхронного кода
+    print(f"[{time.time():.2f}] Начинаю скачивание {name}")
+
+    loop = asyncio.get_running_loop()
+    filename = os.path.join(store.folder, name)
+    part_name = filename + ".part"
+    validator = {}
+    cached = store.cached(name, url)
+    result = {"url": url, "name": name, "status": "failed", "attempts": 0}
+    metrics = stats.get("metrics") if stats is not None else None
+
+    for attempt in range(retry.max_retries + 1):
+        result["attempts"] = attempt + 1
+        try:
+            trace = metrics.start(url) if metrics is not None else None
+            try:
+                size, sha256 = await _fetch_to_file(session, url, part_name, validator, cached, trace)
+            except BaseException as e:
+                if trace is not None:
+                    metrics.record(trace, e)
+                raise
+            if trace is not None:
+                metrics.record(trace)
+            if sha256 is None:
+                if stats is not None:
+                    stats["not_modified"] += 1
+                print(f"[{time.time():.2f}] {name} не изменился")
+                result.update(status="not_modified", size=cached["size"], sha256=cached["sha256"])
+                return result
+
+            duplicate = await loop.run_in_executor(None, store.commit, part_name, sha256, name)
+            await loop.run_in_executor(None, _discard_part, part_name)
+            store.remember(name, url, sha256, size, validator)
+            if duplicate and stats is not None:
+                stats["deduplicated"] += 1
+            elapsed = time.time() - start_time
+            print(f"[{time.time():.2f}] Скачан {name}. Размер: {size} байт. Время: {elapsed:.2f} сек")
+            result.update(status="ok", size=size, sha256=sha256)
+            return result
+        except aiohttp.ClientResponseError as e:
+            print(f"[{time.time():.2f}] Ошибка при скачивании {name}: {e.status}")
+            result["error"] = f"HTTP {e.status}"
+            return result
+        except (RetryableError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retry.max_retries:
+                print(f"[{time.time():.2f}] Не удалось скачать {name} после {attempt + 1} попыток: {e!r}")
+                result["error"] = repr(e)
+                return result
+            delay = retry.delay(attempt, getattr(e, "retry_after", None))
+            if stats is not None:
+                stats["retries"][url] += 1
+            print(f"[{time.time():.2f}] Повтор скачивания {name} через {delay:.2f} сек: {e!r}")
+            await asyncio.sleep(delay)
+        except Exception as e:
+            print(f"[{time.time():.2f}] Исключение при скачивании {name}: {e}")
+            result["error"] = repr(e)
+            return result
+
+
+async def download_ai_face(
+    session: aiohttp.ClientSession,
+    index: int,
+    store: ContentStore,
+    url: str = DEFAULT_URL,
+    retry: RetryPolicy = RetryPolicy(),
+    stats: dict | None = None,
+) -> str | None:
+    """
+    Скачивает сгенерированное ИИ изображение лица с thispersondoesnotexist.com
+    в файл ai_face_{index}.jpg (см. download_file).
+    Возвращает путь к файлу или None, если скачать не удалось.
+    """
+    name = f"ai_face_{index}.jpg"
+    result = await download_file(session, url, name, store, retry, stats)
+    if result["status"] == "failed":
+        return None
+    return os.path.join(store.folder, name)
+
+
+async def download_worker(
+    session: aiohttp.ClientSession,
+    jobs: asyncio.Queue,
+    store: ContentStore,
+    url: str,
+    stats: dict,
+    retry: RetryPolicy,
+) -> None:
+    """Обработчик из пула: берет номера изображений из очереди, пока не получит None."""
+    while True:
+        index = await jobs.get()
+        try:
+            if index is None:
+                return
+            if await download_ai_face(session, index, store, url, retry, stats):
+                stats["success"] += 1
+            else:
+                stats["failed"] += 1
+        finally:
+            jobs.task_done()
+
+
+class LatencyHistogram:
+    """
+    Гистограмма длительностей с фиксированным числом корзин: память не зависит
+    от числа запросов. Границы корзин растут геометрически, STEPS корзин на каждое
+    удвоение начиная с MIN_SECONDS, поэтому перцентиль, взятый по верхней границе
+    корзины, завышен не больше чем на 2 ** (1 / STEPS) - около 9%.
+    """
+    MIN_SECONDS = 1e-6
+    STEPS = 8
+    # Последняя корзина - от 2 ** 34 микросекунд (около 4.8 часа) и больше
+    BUCKETS = 34 * STEPS + 1
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        """Учитывает одну длительность в секундах."""
+        if seconds <= self.MIN_SECONDS:
+            index = 0
+        else:
+            index = min(math.ceil(math.log2(seconds / self.MIN_SECONDS) * self.STEPS), self.BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Перцентиль q (от 0 до 1) по ближайшему рангу: верхняя граница его корзины, сек."""
+        if not self.count:
+            return 0.0
+        rank = min(self.count, int(q * self.count) + 1)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                break
+        return self.MIN_SECONDS * 2 ** (index / self.STEPS)
+
+
+class DownloadMetrics:
+    """
+    Метрики отдельных HTTP-запросов и их сводка.
+
+    Времена этапов снимаются через aiohttp.TraceConfig (см. trace_config):
+    разрешение имени, установка соединения, время до первого байта ответа и
+    передача тела. Число байт тела считает _fetch_to_file: сигнал
+    on_response_chunk_received при потоковом чтении не отправляется.
+    Каждый запрос описывается словарем, который создает start и закрывает record; если задан output, записи построчно пишутся туда в JSONL.
+    """
+    PHASES = ("dns", "connect", "ttfb", "transfer", "total")
+
+    def __init__(self, output: str | None = None):
+        self.output = open(output, "a", encoding="utf-8", buffering=1 << 20) if output else None
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.statuses = collections.Counter()
+        self.latencies = {phase: LatencyHistogram() for phase in self.PHASES}
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """TraceConfig, заполняющий словарь trace, переданный в запрос как trace_request_ctx."""
+        def handler(key, action=None):
+            async def on_signal(session, context, params):
+                trace = context.trace_request_ctx
+                if trace is None:
+                    return
+                if action is None:
+                    trace[key] = time.perf_counter()
+                else:
+                    action(trace, params)
+            return on_signal
+
+        def on_request_end(trace, params):
+            trace["headers"] = time.perf_counter()
+            trace["status"] = params.response.status
+
+        config = aiohttp.TraceConfig()
+        config.on_dns_resolvehost_start.append(handler("dns_start"))
+        config.on_dns_resolvehost_end.append(handler("dns_end"))
+        config.on_connection_create_start.append(handler("connect_start"))
+        config.on_connection_create_end.append(handler("connect_end"))
+        config.on_request_end.append(handler(None, on_request_end))
+        return config
+
+    def start(self, url: str) -> dict:
+        return {"url": url, "start": time.perf_counter()}
+
+    def record(self, trace: dict, error: BaseException | None = None) -> dict:
+        """Закрывает запрос trace, добавляет его в сводку и возвращает запись с длительностями."""
+        end = time.perf_counter()
+        start = trace["start"]
+        dns = trace.get("dns_end", 0.0) - trace.get("dns_start", 0.0)
+        connect = trace.get("connect_end", 0.0) - trace.get("connect_start", 0.0) - dns
+        headers = trace.get("headers")
+        entry = {
+            "url": trace["url"],
+            "status": trace.get("status"),
+            "bytes": trace.get("bytes", 0),
+            "dns": dns,
+            "connect": connect,
+            "ttfb": headers - start if headers else None,
+            "transfer": end - headers if headers else None,
+            "total": end - start,
+        }
+        if error is not None:
+            entry["error"] = repr(error)
+            self.errors += 1
+
+        self.requests += 1
+        self.bytes += entry["bytes"]
+        self.statuses[entry["status"]] += 1
+        for phase in self.PHASES:
+            if entry[phase] is not None:
+                self.latencies[phase].observe(entry[phase])
+        if self.output is not None:
+            self.output.write(json.dumps(entry) + "\n")
+        return entry
+
+    def summary(self) -> dict:
+        """Сводка: число запросов, байты, байт/с и p50/p95/p99 по каждому этапу."""
+        elapsed = time.perf_counter() - self.started
+        result = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "elapsed": elapsed,
+            "bytes_per_sec": self.bytes / elapsed if elapsed > 0 else 0.0,
+            "statuses": dict(self.statuses),
+        }
+        for phase in self.PHASES:
+            for q in (50, 95, 99):
+                result[f"{phase}_p{q}"] = self.latencies[phase].quantile(q / 100)
+        return result
+
+    def close(self) -> None:
+        if self.output is not None:
+            self.output.close()
+            self.output = None
+
+
+class Checkpoint:
+    """
+    Прогресс обработки манифеста для продолжения прерванного запуска.
+
+    Строки завершаются не по порядку, поэтому хранится номер next_line, до которого
+    обработано все, и множество done завершенных строк за ним. Множество не растет
+    больше числа строк, одновременно находящихся в работе.
+
+    Прогресс привязан к содержимому манифеста: к пути, размеру и времени изменения
+    файла, поэтому измененный манифест обрабатывается заново. У стандартного ввода
+    этих признаков нет, и его прогресс продолжается, только если файл прогресса
+    указан явно (explicit=True). После успешного завершения файл прогресса удаляется.
+    """
+    def __init__(self, path: str, manifest: str, explicit: bool = False):
+        self.path = path
+        self.manifest = manifest
+        self.explicit = explicit
+        self.next_line = 1
+        self.done = set()
+        self.identity = {"manifest": manifest}
+
+    def load(self) -> None:
+        """Читает сохраненный прогресс, если он относится к тому же содержимому манифеста."""
+        if self.manifest != "-":
+            stat = os.stat(self.manifest)
+            self.identity = {
+                "manifest": os.path.abspath(self.manifest),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+        elif not self.explicit:
+            return
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        if all(data.get(key) == value for key, value in self.identity.items()):
+            self.next_line = data["next_line"]
+            self.done = set(data["done"])
+
+    def is_done(self, line_no: int) -> bool:
+        return line_no < self.next_line or line_no in self.done
+
+    def mark(self, line_no: int) -> None:
+        """Отмечает строку line_no обработанной и сдвигает next_line."""
+        self.done.add(line_no)
+        while self.next_line in self.done:
+            self.done.remove(self.next_line)
+            self.next_line += 1
+
+    def state(self) -> dict:
+        return {**self.identity, "next_line": self.next_line, "done": sorted(self.done)}
+
+    def save(self, state: dict) -> None:
+        """Атомарно записывает снимок прогресса state."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        """Удаляет файл прогресса после полной обработки манифеста."""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
+
+
+def manifest_name(line_no: int, url: str, name: str | None = None) -> str:
+    """
+    Имя файла для строки манифеста: явно указанное во втором столбце
+    или номер строки с последним компонентом пути из url.
+    """
+    if name:
+        return os.path.basename(name)
+    base = os.path.basename(unquote(urlparse(url).path)) or "file"
+    return f"{line_no}_{base}"
+
+
+async def read_manifest(path: str) -> AsyncIterator[tuple[int, str | None, str | None]]:
+    """
+    Построчно читает манифест path ("-" - стандартный ввод), не загружая его целиком.
+
+    Каждая строка - адрес и, через пробел, необязательное имя файла;
+    пустые строки и строки с # дают (номер, None, None).
+    Чтение идет порциями по MANIFEST_BATCH_BYTES в потоке исполнителя.
+    """
+    loop = asyncio.get_running_loop()
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        line_no = 0
+        while True:
+            lines = await loop.run_in_executor(None, f.readlines, MANIFEST_BATCH_BYTES)
+            if not lines:
+                return
+            for line in lines:
+                line_no += 1
+                fields = line.split()
+                if not fields or fields[0].startswith("#"):
+                    yield line_no, None, None
+                else:
+                    yield line_no, fields[0], fields[1] if len(fields) > 1 else None
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+async def manifest_worker(
+    session: aiohttp.ClientSession,
+    jobs: asyncio.Queue,
+    store: ContentStore,
+    stats: dict,
+    retry: RetryPolicy,
+    report,
+    checkpoint: Checkpoint,
+) -> None:
+    """
+    Обработчик из пула для режима манифеста: скачивает строки из очереди,
+    дописывает результат в отчет report и только после этого отмечает строку
+    в checkpoint. Отчет открыт в двоичном режиме: запись в буферизованный
+    двоичный файл из разных потоков исполнителя не перемешивает строки.
+    """
+    while True:
+        job = await jobs.get()
+        try:
+            if job is None:
+                return
+            line_no, url, name = job
+            result = await download_file(session, url, name, store, retry, stats)
+            stats["failed" if result["status"] == "failed" else "success"] += 1
+            record = json.dumps({"line": line_no, **result}, ensure_ascii=False) + "\n"
+            await report.write(record.encode("utf-8"))
+            checkpoint.mark(line_no)
+        finally:
+            jobs.task_done()
+
+
+async def _save_progress(store: ContentStore, checkpoint: Checkpoint, report, completed: bool = False) -> None:
+    """Сбрасывает отчет на диск и затем сохраняет индекс и прогресс (или удаляет его при completed)."""
     loop = asyncio.get_running_loop()
-    await loop.run_in_executor(None, lambda: Path(artifacts_folder).mkdir(exist_ok=True, parents=True))
-    
-    # Устанавливаем больший лимит соединений
+    await report.flush()
+    state = checkpoint.state()
+    await loop.run_in_executor(None, store.save)
+    if completed:
+        await loop.run_in_executor(None, checkpoint.clear)
+    else:
+        await loop.run_in_executor(None, checkpoint.save, state)
+
+
+async def _progress_saver(store: ContentStore, checkpoint: Checkpoint, report, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await _save_progress(store, checkpoint, report)
+
+
+def _make_session(
+    concurrency: int,
+    per_host_limit: int,
+    connect_timeout: float,
+    read_timeout: float,
+    metrics: DownloadMetrics | None = None,
+) -> aiohttp.ClientSession:
     connector = aiohttp.TCPConnector(
         ssl=False,
-        limit=count,
+        limit=concurrency,
+        limit_per_host=per_host_limit,
     )
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+    trace_configs = [metrics.trace_config()] if metrics is not None else None
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=trace_configs)
+
+
+def _new_stats(collect_metrics: bool = False, metrics_file: str | None = None) -> dict:
+    """Счетчики запуска; DownloadMetrics создается, только если метрики запрошены."""
+    return {
+        "success": 0,
+        "failed": 0,
+        "not_modified": 0,
+        "deduplicated": 0,
+        "retries": collections.Counter(),
+        "metrics": DownloadMetrics(metrics_file) if collect_metrics or metrics_file else None,
+    }
+
+
+def _print_summary(stats: dict, start_time: float, total: str, artifacts_folder: str) -> None:
+    elapsed = time.time() - start_time
+    print(f"\n[{time.time():.2f}] Скачивание завершено! Общее время: {elapsed:.2f} сек")
+    print(f"Успешно скачано: {stats['success']} из {total}")
+    print(f"Не изменилось с прошлого запуска: {stats['not_modified']}, совпало по содержимому: {stats['deduplicated']}")
+    print(f"Файлы сохранены в папке: {os.path.abspath(artifacts_folder)}")
+    if stats["retries"]:
+        print("Повторные попытки по адресам:")
+        for retried_url, retry_count in stats["retries"].most_common():
+            print(f"  {retried_url}: {retry_count}")
+
+    if stats["metrics"] is None:
+        return
+    summary = stats["metrics"].summary()
+    print(
+        f"Запросов: {summary['requests']}, ошибок: {summary['errors']}, "
+        f"получено {summary['bytes']} байт ({summary['bytes_per_sec'] / 1024 / 1024:.2f} МБ/с)"
+    )
+    for phase in DownloadMetrics.PHASES:
+        print(
+            f"  {phase:<8} p50={summary[f'{phase}_p50'] * 1000:8.1f} мс "
+            f"p95={summary[f'{phase}_p95'] * 1000:8.1f} мс p99={summary[f'{phase}_p99'] * 1000:8.1f} мс"
+        )
+
+
+async def main_manifest(
+    manifest: str,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+    artifacts_folder: str = DEFAULT_FOLDER,
+    retry: RetryPolicy = RetryPolicy(),
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = DEFAULT_READ_TIMEOUT,
+    link_mode: str = "hardlink",
+    report_path: str | None = None,
+    checkpoint_path: str | None = None,
+    checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+    metrics_file: str | None = None,
+    collect_metrics: bool = False,
+) -> dict:
+    """
+    Скачивает все адреса из манифеста пулом из concurrency обработчиков.
+
+    Манифест читается потоково и подается в ограниченную очередь, поэтому память
+    не зависит от его длины. Результат каждой строки сразу дописывается в JSONL-отчет
+    report_path (по умолчанию artifacts_folder/report.jsonl), а прогресс раз в
+    checkpoint_interval секунд и при завершении - в checkpoint_path
+    (по умолчанию artifacts_folder/.checkpoint.json). Повторный запуск с тем же
+    неизмененным манифестом пропускает уже обработанные строки и дописывает отчет;
+    для стандартного ввода это делается только при явно заданном checkpoint_path.
+    После полной обработки манифеста файл прогресса удаляется.
+    При collect_metrics или заданном metrics_file метрики запросов собираются
+    в stats["metrics"] (см. DownloadMetrics), иначе там None; при заданном
+    metrics_file каждый запрос дописывается туда в JSONL.
+    """
+    start_time = time.time()
+    print(f"[{time.time():.2f}] Начало выполнения, манифест: {manifest}")
+
+    loop = asyncio.get_running_loop()
+    store = ContentStore(artifacts_folder, link_mode)
+    await loop.run_in_executor(None, store.load)
+    report_path = report_path or os.path.join(artifacts_folder, "report.jsonl")
+    checkpoint = Checkpoint(
+        checkpoint_path or os.path.join(artifacts_folder, ".checkpoint.json"),
+        manifest,
+        explicit=checkpoint_path is not None,
+    )
+    await loop.run_in_executor(None, checkpoint.load)
+    if checkpoint.next_line > 1:
+        print(f"[{time.time():.2f}] Продолжаю с прерванного места: строка {checkpoint.next_line}")
+
+    stats = _new_stats(collect_metrics, metrics_file)
+    stats["skipped"] = 0
+    async with _make_session(
+        concurrency, per_host_limit, connect_timeout, read_timeout, stats["metrics"]
+    ) as session, \
+            aiofiles.open(report_path, "ab") as report:
+        jobs = asyncio.Queue(maxsize=concurrency * 2)
+        workers = [
+            asyncio.create_task(manifest_worker(session, jobs, store, stats, retry, report, checkpoint))
+            for _ in range(concurrency)
+        ]
+        saver = asyncio.create_task(_progress_saver(store, checkpoint, report, checkpoint_interval))
+        print(f"[{time.time():.2f}] Запущено обработчиков: {concurrency}")
+
+        completed = False
+        try:
+            async for line_no, url, name in read_manifest(manifest):
+                if checkpoint.is_done(line_no):
+                    stats["skipped"] += url is not None
+                elif url is None:
+                    checkpoint.mark(line_no)
+                else:
+                    await jobs.put((line_no, url, manifest_name(line_no, url, name)))
+            for _ in workers:
+                await jobs.put(None)
+            await asyncio.gather(*workers)
+            completed = True
+        finally:
+            saver.cancel()
+            for worker in workers:
+                worker.cancel()
+            await _save_progress(store, checkpoint, report, completed)
+            await loop.run_in_executor(None, store.close)
+            if stats["metrics"] is not None:
+                stats["metrics"].close()
+
+    _print_summary(stats, start_time, f"{stats['success'] + stats['failed']} адресов", artifacts_folder)
+    print(f"Пропущено как обработанные ранее: {stats['skipped']}, отчет: {os.path.abspath(report_path)}")
+    return stats
+
+
+async def main(
+    count: int,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+    url: str = DEFAULT_URL,
+    artifacts_folder: str = DEFAULT_FOLDER,
+    retry: RetryPolicy = RetryPolicy(),
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = DEFAULT_READ_TIMEOUT,
+    link_mode: str = "hardlink",
+    metrics_file: str | None = None,
+    collect_metrics: bool = False,
+) -> dict:
+    """
+    Скачивает count изображений пулом из concurrency обработчиков.
+
+    Номера изображений подаются в ограниченную очередь по мере освобождения
+    обработчиков, поэтому число задач, соединений и буферов в памяти не зависит
+    от count. Число одновременных соединений с одним хостом ограничено per_host_limit.
+    Установка соединения ограничена connect_timeout секундами, ожидание очередной
+    порции данных - read_timeout секундами.
+    Файлы складываются в хранилище с адресацией по содержимому (см. ContentStore),
+    повторный запуск делает условные запросы и не скачивает неизменившиеся ресурсы.
+    При collect_metrics или заданном metrics_file метрики запросов собираются
+    в stats["metrics"] (см. DownloadMetrics), иначе там None.
+    """
+    start_time = time.time()
+    print(f"[{time.time():.2f}] Начало выполнения")
+
+    # Создаем директорию и читаем индекс до начала асинхронного кода
+    loop = asyncio.get_running_loop()
+    store = ContentStore(artifacts_folder, link_mode)
+    await loop.run_in_executor(None, store.load)
+
+    stats = _new_stats(collect_metrics, metrics_file)
+
+    async with _make_session(
+        concurrency, per_host_limit, connect_timeout, read_timeout, stats["metrics"]
+    ) as session:
+        jobs = asyncio.Queue(maxsize=concurrency * 2)
+        workers = [
+            asyncio.create_task(download_worker(session, jobs, store, url, stats, retry))
+            for _ in range(concurrency)
+        ]
+        print(f"[{time.time():.2f}] Запущено обработчиков: {concurrency}")
 
-    async with aiohttp.ClientSession(connector=connector) as session:
-        tasks = []
-        
         for i in range(1, count + 1):
-            task = asyncio.create_task(download_ai_face(session, i, artifacts_folder))
-            tasks.append(task)
-            print(f"[{time.time():.2f}] Задача {i} создана")
+            await jobs.put(i)
+        for _ in workers:
+            await jobs.put(None)
+
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            await loop.run_in_executor(None, store.close)
+            if stats["metrics"] is not None:
+                stats["metrics"].close()
+
+    _print_summary(stats, start_time, f"{count} изображений", artifacts_folder)
+    return stats
+
+
+def _run_benchmark_server(
+    port: int, size: int, latency: float, bandwidth: float, error_rate: float, ready
+) -> None:
+    """
+    Локальный сервер для бенчмарка: отвечает телом из size байт после задержки latency,
+    отдает его со скоростью не больше bandwidth байт/с (0 - без ограничения)
+    и с вероятностью error_rate отвечает 503.
+    """
+    body = os.urandom(size)
+
+    async def handler(request):
+        await asyncio.sleep(latency)
+        if random.random() < error_rate:
+            return web.Response(status=503, headers={"Retry-After": "0"})
+        response = web.StreamResponse(headers={"Content-Length": str(size)})
+        await response.prepare(request)
+        for offset in range(0, size, CHUNK_SIZE):
+            chunk = body[offset:offset + CHUNK_SIZE]
+            await response.write(chunk)
+            if bandwidth:
+                await asyncio.sleep(len(chunk) / bandwidth)
+        await response.write_eof()
+        return response
+
+    async def serve():
+        app = web.Application()
+        app.router.add_get("/{name}", handler)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port, backlog=4096).start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
 
-        downloaded_files = await asyncio.gather(*tasks)
+def _raise_open_files_limit() -> int:
+    """Поднимает мягкий лимит открытых файлов до жесткого и возвращает его."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        soft = hard
+    return soft
+
+
+def benchmark(
+    concurrency_levels=BENCHMARK_CONCURRENCY,
+    count: int = 2000,
+    size: int = CHUNK_SIZE,
+    latency: float = 0.05,
+    bandwidth: float = 0.0,
+    error_rate: float = 0.01,
+    output: str = BENCHMARK_RESULTS,
+) -> list:
+    """
+    Нагрузочный бенчмарк загрузчика на локальном сервере с заданной задержкой,
+    пропускной способностью и долей ошибок.
+
+    Сервер работает в отдельном процессе, чтобы не делить цикл событий с клиентом.
+    Для каждого уровня конкурентности скачивается max(count, concurrency) файлов
+    во временную папку; результаты пишутся таблицей в output.
+    """
+    files_limit = _raise_open_files_limit()
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=_run_benchmark_server, args=(port, size, latency, bandwidth, error_rate, ready), daemon=True
+    )
+    server.start()
+    ready.wait()
 
-        successful_downloads = [f for f in downloaded_files if f]
-        elapsed = time.time() - start_time
-        print(f"\n[{time.time():.2f}] Скачивание завершено! Общее время: {elapsed:.2f} сек")
-        print(f"Успешно скачано: {len(successful_downloads)} из {count} изображений")
-        print(f"Файлы сохранены в папке: {os.path.abspath(artifacts_folder)}")
+    lines = [
+        f"Бенчмарк загрузчика: файлы по {size} байт, задержка сервера {latency * 1000:.0f} мс, "
+        f"полоса {'без ограничения' if not bandwidth else f'{bandwidth:.0f} байт/с'}, доля ошибок {error_rate}",
+        "",
+        "| Конкурентность | Файлов | Запросов | Ошибок | МБ/с   | Файлов/с | TTFB p50 (мс) | p50 (мс) | p95 (мс) | p99 (мс) |",
+        "|----------------|--------|----------|--------|--------|----------|---------------|----------|----------|----------|",
+    ]
+    print("\n".join(lines))
+    results = []
+    try:
+        for concurrency in concurrency_levels:
+            if files_limit and concurrency * 2 > files_limit:
+                print(f"Пропускаю конкурентность {concurrency}: лимит открытых файлов {files_limit}")
+                continue
+            n = max(count, concurrency)
+            with tempfile.TemporaryDirectory() as folder, \
+                    open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                stats = asyncio.run(main(
+                    n, concurrency, concurrency, f"http://127.0.0.1:{port}/face.jpg", folder,
+                    RetryPolicy(max_retries=10, backoff_base=0.05, backoff_max=1.0),
+                    collect_metrics=True,
+                ))
+                elapsed = time.perf_counter() - start
+            summary = stats["metrics"].summary()
+            summary.update(concurrency=concurrency, files=stats["success"], elapsed=elapsed)
+            results.append(summary)
+            line = (
+                f"| {concurrency:14d} | {stats['success']:6d} | {summary['requests']:8d} | "
+                f"{summary['errors']:6d} | "
+                f"{summary['bytes'] / elapsed / 1024 / 1024:6.1f} | {stats['success'] / elapsed:8.0f} | "
+                f"{summary['ttfb_p50'] * 1000:13.1f} | {summary['total_p50'] * 1000:8.1f} | "
+                f"{summary['total_p95'] * 1000:8.1f} | {summary['total_p99'] * 1000:8.1f} |"
+            )
+            print(line)
+            lines.append(line)
+    finally:
+        server.terminate()
+        server.join()
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return results
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
-        description="Скачивание AI-сгенерированных лиц без ограничений"
+        description="Скачивание AI-сгенерированных лиц с ограничением числа одновременных загрузок"
+    )
+    parser.add_argument("count", type=int, nargs="?", help="Количество изображений для скачивания")
+    parser.add_argument(
+        "--metrics", action="store_true",
+        help="Собирать метрики HTTP-запросов и выводить сводку по этапам (включается и --metrics-file)"
+    )
+    parser.add_argument("--metrics-file", help="JSONL-файл с метриками каждого HTTP-запроса")
+    parser.add_argument(
+        "--benchmark", action="store_true",
+        help="Нагрузочный бенчмарк на локальном сервере вместо скачивания"
+    )
+    parser.add_argument(
+        "--bench-concurrency", default=",".join(map(str, BENCHMARK_CONCURRENCY)),
+        help="Уровни конкурентности бенчмарка через запятую"
+    )
+    parser.add_argument("--bench-count", type=int, default=2000, help="Файлов на каждый уровень бенчмарка")
+    parser.add_argument("--bench-size", type=int, default=CHUNK_SIZE, help="Размер файла в бенчмарке, байт")
+    parser.add_argument("--bench-latency", type=float, default=0.05, help="Задержка ответа сервера в бенчмарке, сек")
+    parser.add_argument(
+        "--bench-bandwidth", type=float, default=0.0,
+        help="Скорость отдачи одного ответа сервером в бенчмарке, байт/с (0 - без ограничения)"
+    )
+    parser.add_argument("--bench-error-rate", type=float, default=0.01, help="Доля ответов 503 в бенчмарке")
+    parser.add_argument(
+        "--manifest",
+        help="Файл со списком адресов (по одному в строке, - для стандартного ввода) вместо count"
+    )
+    parser.add_argument("--report", help="JSONL-отчет режима манифеста (по умолчанию FOLDER/report.jsonl)")
+    parser.add_argument(
+        "--checkpoint",
+        help="Файл прогресса режима манифеста (по умолчанию FOLDER/.checkpoint.json); "
+             "продолжение чтения стандартного ввода возможно только с явным --checkpoint"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help="Максимальное число одновременных загрузок"
+    )
+    parser.add_argument(
+        "--per-host-limit", type=int, default=DEFAULT_PER_HOST_LIMIT,
+        help="Максимальное число одновременных соединений с одним хостом"
+    )
+    parser.add_argument("--url", default=DEFAULT_URL, help="Адрес, с которого скачиваются изображения")
+    parser.add_argument("--folder", default=DEFAULT_FOLDER, help="Папка для сохранения изображений")
+    parser.add_argument(
+        "--retries", type=int, default=RetryPolicy.max_retries,
+        help="Максимальное число повторных попыток для одного изображения"
+    )
+    parser.add_argument(
+        "--connect-timeout", type=float, default=DEFAULT_CONNECT_TIMEOUT,
+        help="Таймаут установки соединения, сек"
+    )
+    parser.add_argument(
+        "--read-timeout", type=float, default=DEFAULT_READ_TIMEOUT,
+        help="Таймаут ожидания очередной порции данных, сек"
+    )
+    parser.add_argument(
+        "--link-mode", choices=LINK_MODES, default="hardlink",
+        help="Как файлы с номерами ссылаются на хранилище: жесткие или символические ссылки"
     )
-    parser.add_argument("count", type=int, help="Количество изображений для скачивания")
     args = parser.parse_args()
 
-    if args.count <= 0:
+    if args.benchmark:
+        benchmark(
+            [int(level) for level in args.bench_concurrency.split(",")], args.bench_count,
+            args.bench_size, args.bench_latency, args.bench_bandwidth, args.bench_error_rate,
+        )
+    elif (args.count is None) == (args.manifest is None):
+        print("Нужно указать либо количество изображений, либо --manifest!")
+    elif args.count is not None and args.count <= 0:
         print("Количество изображений должно быть положительным числом!")
+    elif args.concurrency <= 0 or args.per_host_limit <= 0:
+        print("Ограничения на число загрузок должны быть положительными числами!")
+    elif args.manifest is not None:
+        asyncio.run(main_manifest(
+            args.manifest, args.concurrency, args.per_host_limit, args.folder,
+            RetryPolicy(max_retries=args.retries), args.connect_timeout, args.read_timeout,
+            args.link_mode, args.report, args.checkpoint, DEFAULT_CHECKPOINT_INTERVAL, args.metrics_file,
+            args.metrics,
+        ))
     else:
-        asyncio.run(main(args.count))
\ No newline at end of file
+        asyncio.run(main(
+            args.count, args.concurrency, args.per_host_limit, args.url, args.folder,
+            RetryPolicy(max_retries=args.retries), args.connect_timeout, args.read_timeout,
+            args.link_mode, args.metrics_file, args.metrics,
+        ))
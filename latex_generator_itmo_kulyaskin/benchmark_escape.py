@@ -0,0 +1,105 @@
+"""
+Сравнение скорости экранирования и генерации больших таблиц: прежняя реализация
+(словарь замен, собираемый при каждом вызове, и посимвольный генератор)
+против escape_latex на заранее построенной таблице str.translate, а также
+таблица из числового массива NumPy: tolist() с поячеечным форматированием
+против передачи массива напрямую.
+
+Запуск из папки latex_generator_itmo_kulyaskin:
+    python benchmark_escape.py --rows 200000
+"""
+import argparse
+import io
+import time
+
+from latex_generator_itmo_kulyaskin import latex_generator
+from latex_generator_itmo_kulyaskin.latex_generator import escape_latex, generate_table, write_table
+
+
+def escape_latex_reference(text):
+    """Прежняя реализация экранирования, для сравнения."""
+    if not isinstance(text, str):
+        text = str(text)
+    replacements = {
+        "&": "\\&",
+        "%": "\\%",
+        "$": "\\$",
+        "#": "\\#",
+        "_": "\\_",
+        "{": "\\{",
+        "}": "\\}",
+        "~": "\\textasciitilde{}",
+        "^": "\\textasciicircum{}"
+    }
+    return "".join(replacements.get(c, c) for c in text)
+
+
+def make_rows(n_rows):
+    """Строки таблицы: числа, обычные слова и текст со специальными символами."""
+    for i in range(n_rows):
+        yield [i, i * 0.5, f"user_{i}", "Москва", "100% & more", f"item #{i}"]
+
+
+def measure(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n_rows):
+    cells = [cell for row in make_rows(n_rows) for cell in row]
+
+    old_escape = measure(lambda: [escape_latex_reference(cell) for cell in cells])
+    new_escape = measure(lambda: [escape_latex(cell) for cell in cells])
+
+    def write_with(escape):
+        latex_generator.escape_latex = escape
+        try:
+            write_table(io.StringIO(), make_rows(n_rows))
+        finally:
+            latex_generator.escape_latex = escape_latex
+
+    old_table = measure(lambda: write_with(escape_latex_reference))
+    new_table = measure(lambda: write_with(escape_latex))
+
+    print(f"Ячеек: {len(cells)}, строк таблицы: {n_rows}")
+    print(f"| Операция           | Прежняя (с) | translate (с) | Ускорение |")
+    print(f"|--------------------|-------------|---------------|-----------|")
+    print(f"| escape_latex       | {old_escape:11.3f} | {new_escape:13.3f} | {old_escape / new_escape:8.1f}x |")
+    print(f"| write_table        | {old_table:11.3f} | {new_table:13.3f} | {old_table / new_table:8.1f}x |")
+
+
+def main_numeric(size):
+    """Таблица size x size из NumPy: список списков с прежним экранированием против массива."""
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    floats = rng.random((size, size)) * 1000
+    ints = rng.integers(0, 10 ** 6, (size, size))
+
+    def generate_with_reference(array):
+        latex_generator.escape_latex = escape_latex_reference
+        try:
+            generate_table(array.tolist())
+        finally:
+            latex_generator.escape_latex = escape_latex
+
+    print(f"\nЧисловая таблица {size}x{size} ({size * size} ячеек)")
+    print(f"| Данные             | tolist (с)  | ndarray (с)   | Ускорение |")
+    print(f"|--------------------|-------------|---------------|-----------|")
+    for name, array, precision in (("float, precision=3", floats, 3), ("int", ints, None)):
+        old = measure(lambda: generate_with_reference(array), repeat=1)
+        new = measure(lambda: generate_table(array, precision=precision))
+        print(f"| {name:18} | {old:11.3f} | {new:13.3f} | {old / new:8.1f}x |")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк экранирования LaTeX")
+    parser.add_argument("--rows", type=int, default=200000, help="Количество строк таблицы")
+    parser.add_argument("--matrix-size", type=int, default=1000, help="Размер числовой таблицы (нужен NumPy)")
+    args = parser.parse_args()
+    main(args.rows)
+    main_numeric(args.matrix_size)
@@ -1,4 +1,4 @@
-from .latex_generator import generate_image, generate_table
+from .latex_generator import escape_latex, generate_image, generate_table, iter_table, write_table
 
-__all__ = ['generate_table', 'generate_image']
+__all__ = ['generate_table', 'generate_image', 'iter_table', 'write_table', 'escape_latex']
 __version__ = '0.1.0'
\ No newline at end of file
@@ -1,62 +1,245 @@
-def generate_table(data, caption=None, label=None):
+import itertools
+import operator
+import re
+
+# Замены специальных символов LaTeX. Обратная косая черта заменяется командой
+# \textbackslash{}: удвоенная "\\" в LaTeX означает перевод строки.
+LATEX_REPLACEMENTS = {
+    "\\": "\\textbackslash{}",
+    "&": "\\&",
+    "%": "\\%",
+    "$": "\\$",
+    "#": "\\#",
+    "_": "\\_",
+    "{": "\\{",
+    "}": "\\}",
+    "~": "\\textasciitilde{}",
+    "^": "\\textasciicircum{}",
+    "<": "\\textless{}",
+    ">": "\\textgreater{}",
+    "|": "\\textbar{}",
+}
+
+_ESCAPE_TABLE = str.maketrans(LATEX_REPLACEMENTS)
+_SPECIAL_CHARS = re.compile("[" + re.escape("".join(LATEX_REPLACEMENTS)) + "]")
+# Типы, строковое представление которых не содержит специальных символов
+_PLAIN_TYPES = (int, float, bool)
+# Сколько строк массива переводить в списки Python за раз
+ARRAY_CHUNK_ROWS = 4096
+
+
+def escape_latex(text):
     """
-    Функция для генерации LaTeX кода таблицы.
-    
+    Экранирование специальных символов LaTeX.
+
+    Таблица замен для str.translate строится один раз при импорте модуля,
+    а строки без специальных символов (большинство ячеек с числами и словами)
+    возвращаются как есть без копирования. Числа только преобразуются в строку.
+    """
+    if type(text) is not str:
+        if type(text) in _PLAIN_TYPES:
+            return str(text)
+        text = str(text)
+    if _SPECIAL_CHARS.search(text) is None:
+        return text
+    return text.translate(_ESCAPE_TABLE)
+
+
+def _as_array(data):
+    """
+    Двумерный массив NumPy для ndarray и объектов с __array__ (например, MatrixNP),
+    None для списков и прочих итерируемых объектов. NumPy импортируется только здесь,
+    поэтому для списков он не нужен.
+    """
+    if isinstance(data, (list, tuple)) or not hasattr(data, "__array__"):
+        return None
+    import numpy as np
+    array = np.asarray(data)
+    if array.ndim != 2 or array.size == 0:
+        raise ValueError("Массив должен быть непустым и двумерным")
+    return array
+
+
+def _array_rows(array, precision=None):
+    """
+    Строки таблицы LaTeX из двумерного массива.
+
+    Для числовых типов по типу и точности столбцов один раз собирается шаблон строки
+    вида "%d & %.3f \\\\", и каждая строка форматируется одной операцией % над
+    кортежем значений без экранирования: в записи чисел нет специальных символов.
+    Это быстрее поэлементных astype(str) и numpy.char.mod. Остальные типы
+    преобразуются и экранируются поячеечно.
+
     Аргументы:
-        data (list): Двумерный список, представляющий данные таблицы.
+        array: Двумерный массив NumPy.
+        precision (int или list, optional): Число знаков после запятой для вещественных
+            столбцов, одно на все столбцы или список по столбцам; None - как str().
+    """
+    # Массив переводится в списки порциями, чтобы не держать копию таблицы целиком
+    chunks = (array[start:start + ARRAY_CHUNK_ROWS].tolist() for start in range(0, len(array), ARRAY_CHUNK_ROWS))
+    kind = array.dtype.kind
+    if kind not in "iuf":
+        for chunk in chunks:
+            for row in chunk:
+                yield " & ".join(map(escape_latex, row)) + " \\\\"
+        return
+
+    num_columns = array.shape[1]
+    if precision is None or not hasattr(precision, "__len__"):
+        precision = [precision] * num_columns
+    # operator.index принимает и целые NumPy (np.int64 из метаданных массива)
+    precision = [None if p is None else operator.index(p) for p in precision]
+    if len(precision) != num_columns:
+        raise ValueError("Число значений precision должно совпадать с числом столбцов")
+
+    if kind == "f":
+        cell_formats = ["%s" if p is None else f"%.{p}f" for p in precision]
+    else:
+        cell_formats = ["%d"] * num_columns
+    row_format = " & ".join(cell_formats) + " \\\\"
+    for chunk in chunks:
+        for row in chunk:
+            yield row_format % tuple(row)
+
+
+def iter_table(rows, caption=None, label=None, longtable=False, repeat_header=False,
+               header=None, precision=None):
+    """
+    Генератор строк LaTeX кода таблицы.
+
+    В отличие от generate_table, принимает любой итерируемый объект строк
+    (список, генератор, курсор БД) и не держит таблицу в памяти целиком:
+    каждая строка данных превращается в строку LaTeX по мере чтения.
+    Число столбцов определяется по первой строке данных.
+    Массивы NumPy и MatrixNP числовых типов форматируются целыми строками
+    без экранирования (см. _array_rows).
+
+    Аргументы:
+        rows (iterable): Итерируемый объект строк таблицы, каждая строка - итерируемый объект ячеек.
         caption (str, optional): Подпись к таблице.
         label (str, optional): Метка для перекрестных ссылок.
-    
+        longtable (bool, optional): Использовать окружение longtable для таблиц на несколько
+            страниц (требует \\usepackage{longtable}).
+        repeat_header (bool, optional): Для longtable повторять первую строку на каждой странице.
+        header (list, optional): Строка заголовков, выводится перед данными.
+        precision (int или list, optional): Число знаков после запятой для вещественных
+            столбцов массива.
+
     Возвращает:
-        str: Строка, содержащая LaTeX код таблицы.
+        generator: Строки LaTeX кода без символов перевода строки.
     """
-    if not data or not all(isinstance(row, list) for row in data):
-        raise ValueError("Данные должны быть непустым двумерным списком")
-
-    num_columns = len(data[0])
-    
-    column_format = "|" + "|".join(["c"] * num_columns) + "|"
-    
-    def escape_latex(text):
-        """Экранирование специальных символов LaTeX."""
-        if not isinstance(text, str):
-            text = str(text)
-        replacements = {
-            "&": "\\&",
-            "%": "\\%",
-            "$": "\\$",
-            "#": "\\#",
-            "_": "\\_",
-            "{": "\\{",
-            "}": "\\}",
-            "~": "\\textasciitilde{}",
-            "^": "\\textasciicircum{}"
-        }
-        return "".join(replacements.get(c, c) for c in text)
-    
     def create_row(row):
         """Создание строки таблицы."""
-        return " & ".join(escape_latex(cell) for cell in row) + " \\\\"
-    
-    rows = [create_row(row) for row in data]
-    
-    rows_with_lines = ["\\hline"] + [f"{row}\n\\hline" for row in rows]
-    
-    tabular_content = "\n".join(rows_with_lines)
-    
-    tabular = f"\\begin{{tabular}}{{{column_format}}}\n{tabular_content}\n\\end{{tabular}}"
-    
-    table_elements = ["\\begin{table}[h]", "\\centering", tabular]
-    
+        return " & ".join(map(escape_latex, row)) + " \\\\"
+
+    array = _as_array(rows)
+    if array is not None:
+        num_columns = array.shape[1]
+        rendered = _array_rows(array, precision)
+    else:
+        rows = iter(rows)
+        first_row = next(rows, None)
+        if first_row is None:
+            raise ValueError("Данные должны быть непустым двумерным списком")
+        first_row = list(first_row)
+        num_columns = len(first_row)
+        rendered = itertools.chain([create_row(first_row)], map(create_row, rows))
+
+    if header is not None:
+        rendered = itertools.chain([create_row(header)], rendered)
+    first_line = next(rendered)
+
+    column_format = "|" + "|".join(["c"] * num_columns) + "|"
+
+    if longtable:
+        yield f"\\begin{{longtable}}{{{column_format}}}"
+        if caption or label:
+            caption_line = f"\\caption{{{escape_latex(caption)}}}" if caption else ""
+            if label:
+                caption_line += f"\\label{{{label}}}"
+            yield caption_line + " \\\\"
+        yield "\\hline"
+        yield first_line
+        yield "\\hline"
+        if repeat_header:
+            # Подпись с меткой - только на первой странице; на следующих повторяется
+            # заголовок с подписью без записи в список таблиц и без метки
+            yield "\\endfirsthead"
+            if caption:
+                yield f"\\caption[]{{{escape_latex(caption)}}} \\\\"
+            yield "\\hline"
+            yield first_line
+            yield "\\hline"
+            yield "\\endhead"
+        for line in rendered:
+            yield line
+            yield "\\hline"
+        yield "\\end{longtable}"
+        return
+
+    yield "\\begin{table}[h]"
+    yield "\\centering"
+    yield f"\\begin{{tabular}}{{{column_format}}}"
+    yield "\\hline"
+    yield first_line
+    yield "\\hline"
+    for line in rendered:
+        yield line
+        yield "\\hline"
+    yield "\\end{tabular}"
+
     if caption:
-        table_elements.append(f"\\caption{{{escape_latex(caption)}}}")
-    
+        yield f"\\caption{{{escape_latex(caption)}}}"
+
     if label:
-        table_elements.append(f"\\label{{{label}}}")
+        yield f"\\label{{{label}}}"
+
+    yield "\\end{table}"
+
+
+def write_table(fp, rows, caption=None, label=None, longtable=False, repeat_header=False,
+                header=None, precision=None):
+    """
+    Потоковая запись LaTeX кода таблицы в файловый объект.
+
+    Память не зависит от числа строк: строки из rows читаются и пишутся в fp по одной
+    (параметры те же, что у iter_table).
+
+    Аргументы:
+        fp: Текстовый файловый объект с методом write.
+        rows (iterable): Итерируемый объект строк таблицы.
+
+    Возвращает:
+        int: Количество записанных строк LaTeX кода.
+    """
+    count = 0
+    for line in iter_table(rows, caption, label, longtable, repeat_header, header, precision):
+        fp.write(line)
+        fp.write("\n")
+        count += 1
+    return count
+
+
+def generate_table(data, caption=None, label=None, longtable=False, header=None, precision=None):
+    """
+    Функция для генерации LaTeX кода таблицы.
     
-    table_elements.append("\\end{table}")
+    Аргументы:
+        data (list или ndarray): Двумерный список, массив NumPy или MatrixNP.
+        caption (str, optional): Подпись к таблице.
+        label (str, optional): Метка для перекрестных ссылок.
+        longtable (bool, optional): Использовать окружение longtable вместо table/tabular.
+        header (list, optional): Строка заголовков над данными.
+        precision (int или list, optional): Число знаков после запятой для вещественных
+            столбцов массива, одно на все столбцы или по столбцам.
     
-    return "\n".join(table_elements) 
+    Возвращает:
+        str: Строка, содержащая LaTeX код таблицы.
+    """
+    if _as_array(data) is None and (not data or not all(isinstance(row, list) for row in data)):
+        raise ValueError("Данные должны быть непустым двумерным списком")
+
+    return "\n".join(iter_table(data, caption, label, longtable, header=header, precision=precision))
 
 
 def generate_image(image_path, caption=None, label=None, width=None, height=None, placement="h"):
@@ -77,23 +260,6 @@ def generate_image(image_path, caption=None, label=None, width=None, height=None
     if not image_path:
         raise ValueError("Путь к изображению не может быть пустым")
     
-    def escape_latex(text):
-        """Экранирование специальных символов LaTeX."""
-        if not isinstance(text, str):
-            text = str(text)
-        replacements = {
-            "&": "\\&",
-            "%": "\\%",
-            "$": "\\$",
-            "#": "\\#",
-            "_": "\\_",
-            "{": "\\{",
-            "}": "\\}",
-            "~": "\\textasciitilde{}",
-            "^": "\\textasciicircum{}"
-        }
-        return "".join(replacements.get(c, c) for c in text)
-    
     options = []
     if width:
         options.append(f"width={width}")
@@ -0,0 +1,30 @@
+import os
+import re
+import subprocess
+import sys
+
+APP = os.path.join(os.path.dirname(__file__), os.pardir, "hw_4", "app.py")
+
+
+def run_app(lines, *args):
+    result = subprocess.run(
+        [sys.executable, APP, *args],
+        input="".join(f"{line}\n" for line in lines),
+        capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_ordered_with_drop_policy_keeps_every_message_accounted():
+    n = 10
+    output = run_app(
+        range(n), "--rate", "1", "--queue-size", "2", "--queue-policy", "drop-oldest",
+        "--ordered", "--drain-timeout", "10",
+    )
+    received = [int(m) for m in re.findall(r"Получено от процесса B: '(\d+)'", output)]
+    dropped = int(re.search(r"Отброшено сообщений: (\d+)", output).group(1))
+
+    assert received == sorted(received)
+    assert received[-1] == n - 1
+    assert len(received) + dropped == n
@@ -0,0 +1,50 @@
+from hw_1.line_index import LineIndex
+
+
+def write(path, text):
+    path.write_bytes(text.encode())
+
+
+def lines(path):
+    index = LineIndex.open(str(path))
+    return index.line_count, list(index.read_lines(0))
+
+
+def test_index_follows_appends(tmp_path):
+    path = tmp_path / "log.txt"
+    write(path, "".join(f"line {i}\n" for i in range(1000)))
+    LineIndex.open(str(path), create=True)
+
+    with open(path, "ab") as f:
+        f.write(b"tail 1\ntail 2\npartial")
+
+    count, content = lines(path)
+    assert count == 1002
+    assert content == path.read_text().splitlines(keepends=True)
+
+
+def test_in_place_edit_of_same_size_rebuilds_index(tmp_path):
+    path = tmp_path / "log.txt"
+    text = "".join(f"line {i:04d}\n" for i in range(3000))
+    write(path, text)
+    LineIndex.open(str(path), create=True)
+
+    # Та же длина файла, но пробел в начале заменен переводом строки
+    write(path, text.replace("line 0010", "line\n0010", 1))
+
+    count, content = lines(path)
+    assert count == 3001
+    assert content == path.read_text().splitlines(keepends=True)
+
+
+def test_in_place_edit_before_append_rebuilds_index(tmp_path):
+    path = tmp_path / "log.txt"
+    text = "".join(f"line {i:04d}\n" for i in range(3000))
+    write(path, text)
+    LineIndex.open(str(path), create=True)
+
+    write(path, text.replace("line 0000", "line\n0000", 1) + "more\n")
+
+    count, content = lines(path)
+    assert count == 3002
+    assert content == path.read_text().splitlines(keepends=True)
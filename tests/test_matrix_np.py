@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from hw_3.matrix_np import MatrixNP
+
+
+def residual(a, x, b):
+    return np.abs(a @ x - b).max()
+
+
+def hilbert(n):
+    return 1 / (np.arange(n)[:, None] + np.arange(n) + 1)
+
+
+def near_singular(n, delta, rng):
+    a = rng.random((n, n))
+    a[-1] = a[0] + delta * rng.random(n)
+    return a
+
+
+@pytest.mark.parametrize("make", [
+    lambda rng: hilbert(12),
+    lambda rng: near_singular(200, 1e-10, rng),
+])
+def test_solve_ill_conditioned_matches_numpy(make):
+    rng = np.random.default_rng(0)
+    a = make(rng)
+    b = rng.random(a.shape[0])
+
+    x = MatrixNP(a).solve(b)
+
+    assert residual(a, x, b) <= 10 * residual(a, np.linalg.solve(a, b), b) + 1e-15
+
+
+def test_solve_reuses_factorization_for_many_right_hand_sides():
+    rng = np.random.default_rng(1)
+    a = rng.random((50, 50))
+    a = a @ a.T + 50 * np.eye(50)
+    matrix = MatrixNP(a)
+    b = rng.random((3, 50, 4))
+
+    assert np.allclose(a @ matrix.solve(b), b)
+    assert np.isclose(matrix.det(), np.linalg.det(a))
+    assert matrix.factorization in ("cholesky", "inverse")